@@ -0,0 +1,89 @@
+"""
+CSV parsing benchmark
+=====================
+
+Compares the original naive loader (str.split + strptime per row) against
+the current DataIngestionService parsing paths and reports rows/sec.
+
+Usage:
+    python benchmarks/bench_csv_parsing.py [--devices 50] [--days 42] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from generate_readings import generate_readings
+from models.reading import EnergyReading
+from services.data_ingestion import DataIngestionService
+
+
+def legacy_load_file(filepath: str) -> List[EnergyReading]:
+    """The pre-optimization loader, kept verbatim as the baseline."""
+    readings = []
+    try:
+        with open(filepath, 'r') as f:
+            next(f)
+            for line in f:
+                parts = line.strip().split(',')
+                if len(parts) != 5:
+                    continue
+                try:
+                    readings.append(EnergyReading(
+                        timestamp=datetime.strptime(parts[0], "%Y-%m-%d %H:%M:%S"),
+                        device_id=parts[1],
+                        voltage=float(parts[2]),
+                        current=float(parts[3]),
+                        power_factor=float(parts[4])
+                    ))
+                except (ValueError, IndexError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return readings
+
+
+def measure(label: str, func, path: str, repeat: int) -> float:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(func(path))
+        best = min(best, time.perf_counter() - start)
+    rate = count / best if best else float("inf")
+    print(f"{label:<28} {count:>10,} rows  {best:8.3f} s  {rate:>12,.0f} rows/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--days", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    service = DataIngestionService()
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        generate_readings(path, args.devices, args.days)
+        baseline = measure("legacy load_file", legacy_load_file, path, args.repeat)
+        for label, func in (
+            ("load_file", service.load_file),
+            ("load_batch", service.load_batch),
+        ):
+            rate = measure(label, func, path, args.repeat)
+            print(f"{'':<28} speedup vs legacy: {rate / baseline:.1f}x")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
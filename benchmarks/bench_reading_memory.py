@@ -0,0 +1,97 @@
+"""
+Reading memory footprint benchmark
+==================================
+
+Measures the memory held per row-level reading, comparing the original
+`@dataclass` EnergyReading (per-instance __dict__, a datetime and a fresh
+device id string per row) against the current slotted representation.
+
+Usage:
+    python benchmarks/bench_reading_memory.py [--devices 50] [--days 7]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from generate_readings import generate_readings
+from services.data_ingestion import DataIngestionService
+
+
+@dataclass
+class LegacyEnergyReading:
+    """The pre-optimization record type, kept verbatim as the baseline."""
+    timestamp: datetime
+    device_id: str
+    voltage: float
+    current: float
+    power_factor: float
+
+
+def legacy_load_file(filepath: str) -> List[LegacyEnergyReading]:
+    readings = []
+    with open(filepath, 'r') as f:
+        next(f)
+        for line in f:
+            parts = line.strip().split(',')
+            if len(parts) != 5:
+                continue
+            try:
+                readings.append(LegacyEnergyReading(
+                    timestamp=datetime.strptime(parts[0], "%Y-%m-%d %H:%M:%S"),
+                    device_id=parts[1],
+                    voltage=float(parts[2]),
+                    current=float(parts[3]),
+                    power_factor=float(parts[4])
+                ))
+            except (ValueError, IndexError):
+                continue
+    return readings
+
+
+def bytes_per_reading(load: Callable[[str], list], path: str) -> float:
+    """Memory still allocated after loading, divided by the number of readings."""
+    gc.collect()
+    tracemalloc.start()
+    readings = load(path)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(readings)
+    del readings
+    return held / count if count else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        rows = generate_readings(path, args.devices, args.days)
+        print(f"Dataset: {rows:,} rows ({args.devices} devices x {args.days} days)\n")
+        legacy = bytes_per_reading(legacy_load_file, path)
+        current = bytes_per_reading(DataIngestionService().load_file, path)
+        batch = bytes_per_reading(DataIngestionService().load_batch, path)
+    finally:
+        os.remove(path)
+
+    print(f"{'representation':<32} {'bytes/reading':>14}")
+    print(f"{'dataclass (legacy)':<32} {legacy:>14.1f}")
+    print(f"{'slotted EnergyReading':<32} {current:>14.1f}  ({legacy / current:.1f}x smaller)")
+    print(f"{'ReadingBatch (columnar)':<32} {batch:>14.1f}  ({legacy / batch:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
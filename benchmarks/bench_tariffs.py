@@ -0,0 +1,108 @@
+"""
+Tariff engine benchmark and backend parity check
+================================================
+
+Times TariffEngine with the pure-Python and NumPy backends and checks that
+both bill the same readings identically. Timestamps are jittered off the
+15-minute grid (so intervals cross slot boundaries) and some rows are
+swapped out of order (so both backends must apply the same ordering rule).
+Exits with status 1 if the backends disagree.
+
+Usage:
+    python benchmarks/bench_tariffs.py [--devices 50] [--days 14] [--chunk 4096]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from generate_readings import generate_readings
+from models.reading_batch import ReadingBatch
+from models.tariff import TariffCost
+from services import kernels
+from services.data_ingestion import DataIngestionService
+from services.tariffs import TariffEngine, load_tariffs
+
+TARIFFS_PATH = Path(__file__).resolve().parent.parent / "src" / "data" / "tariffs.json"
+
+
+def perturb(batch: ReadingBatch, seed: int) -> None:
+    """Jitters timestamps off the slot grid and swaps a few rows out of order, in place."""
+    rng = random.Random(seed)
+    ts = batch.timestamps
+    for i in range(len(ts)):
+        ts[i] += rng.randrange(0, 600)
+    columns = (batch.timestamps, batch.device_codes, batch.voltage, batch.current, batch.power_factor)
+    for i in range(0, len(ts) - 1, 97):
+        for col in columns:
+            col[i], col[i + 1] = col[i + 1], col[i]
+
+
+def bill(batch: ReadingBatch, backend: str, chunk: int) -> Dict[str, TariffCost]:
+    engine = TariffEngine(load_tariffs(str(TARIFFS_PATH)))
+    for start in range(0, len(batch), chunk):
+        engine.update(batch.take(range(start, min(start + chunk, len(batch)))), backend)
+    return engine.costs()
+
+
+def mismatches(left: Dict[str, TariffCost], right: Dict[str, TariffCost]) -> List[str]:
+    def close(a: float, b: float) -> bool:
+        return abs(a - b) <= kernels.RELATIVE_TOLERANCE * max(abs(a), abs(b), 1.0)
+
+    problems = []
+    for name, a in left.items():
+        b = right[name]
+        for field in ("kwh", "cost", "projected_monthly_cost"):
+            if not close(getattr(a, field), getattr(b, field)):
+                problems.append(f"{name}.{field}: {getattr(a, field)!r} != {getattr(b, field)!r}")
+        for band in set(a.band_cost) | set(b.band_cost):
+            if not close(a.band_cost.get(band, 0.0), b.band_cost.get(band, 0.0)):
+                problems.append(f"{name}.band_cost[{band}]: {a.band_cost.get(band)!r} != {b.band_cost.get(band)!r}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk", type=int, default=4096, help="Rows per update() call")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        generate_readings(path, args.devices, args.days, args.seed)
+        batch = DataIngestionService().load_batch(path)
+    finally:
+        os.remove(path)
+    perturb(batch, args.seed)
+    print(f"{len(batch):,} readings, {args.chunk} rows per update")
+
+    results = {}
+    for backend in kernels.BACKENDS:
+        if backend == "numpy" and kernels.np is None:
+            print("numpy   skipped (NumPy is not installed)")
+            continue
+        start = time.perf_counter()
+        results[backend] = bill(batch, backend, args.chunk)
+        elapsed = time.perf_counter() - start
+        print(f"{backend:<7} {elapsed * 1000:>10.1f} ms {len(batch) / elapsed:>14,.0f} rows/s")
+
+    if len(results) == 2:
+        problems = mismatches(results["python"], results["numpy"])
+        for problem in problems:
+            print(f"MISMATCH {problem}", file=sys.stderr)
+        print("backends agree" if not problems else f"{len(problems)} mismatches")
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
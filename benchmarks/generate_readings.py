@@ -0,0 +1,101 @@
+"""
+Synthetic readings generator
+============================
+
+Writes a deterministic readings CSV in the `src/data/readings.csv` schema:
+N devices x M days at a 15-minute cadence, with a daily load cycle per
+device and an optional fraction of malformed rows.
+
+Usage:
+    python benchmarks/generate_readings.py out.csv --devices 100 --days 7 \\
+        [--seed 42] [--malformed-rate 0.001]
+"""
+
+import argparse
+import math
+import random
+from datetime import datetime, timedelta
+
+HEADER = "timestamp,device_id,voltage,current,power_factor\n"
+INTERVAL = timedelta(minutes=15)
+DEFAULT_START = datetime(2023, 10, 1)
+
+# Malformed variants the ingestion code is expected to skip (or, for the
+# quoted timestamp, to parse correctly).
+_MALFORMED = (
+    lambda ts, dev: f"{ts},{dev},120.0,1.5\n",  # missing field
+    lambda ts, dev: f"{ts},{dev},n/a,1.5,0.95\n",  # non-numeric value
+    lambda ts, dev: f"2023-13-45 99:99:99,{dev},120.0,1.5,0.95\n",  # bad timestamp
+    lambda ts, dev: "\n",  # blank line
+    lambda ts, dev: f'"{ts}",{dev},120.0,1.5,0.95\n',  # quoted (valid)
+)
+
+
+def generate_readings(
+    path: str,
+    devices: int,
+    days: int,
+    seed: int = 42,
+    malformed_rate: float = 0.0,
+    start: datetime = DEFAULT_START,
+) -> int:
+    """
+    Writes synthetic readings to `path`.
+
+    Args:
+        path: Destination CSV path.
+        devices: Number of devices (DEV001, DEV002, ...).
+        days: Number of days at a 15-minute cadence.
+        seed: Random seed; the same arguments always produce the same file.
+        malformed_rate: Fraction of rows replaced with a malformed variant.
+        start: Timestamp of the first reading.
+
+    Returns:
+        The number of data rows written (including malformed ones).
+    """
+    rng = random.Random(seed)
+    profiles = [
+        (
+            f"DEV{i + 1:03d}",
+            rng.uniform(0.2, 12.0),  # base current (A)
+            rng.uniform(0.80, 0.99),  # typical power factor
+            rng.uniform(0.0, 2 * math.pi),  # phase of the daily cycle
+        )
+        for i in range(devices)
+    ]
+    steps = days * 24 * 4
+    rows = 0
+    with open(path, "w") as f:
+        f.write(HEADER)
+        for step in range(steps):
+            when = start + step * INTERVAL
+            ts = f"{when:%Y-%m-%d %H:%M:%S}"
+            day_fraction = (when.hour * 60 + when.minute) / 1440.0
+            for device_id, base_current, base_pf, phase in profiles:
+                rows += 1
+                if malformed_rate and rng.random() < malformed_rate:
+                    f.write(rng.choice(_MALFORMED)(ts, device_id))
+                    continue
+                cycle = 1.0 + 0.5 * math.sin(2 * math.pi * day_fraction + phase)
+                current = max(0.0, base_current * cycle * rng.gauss(1.0, 0.05))
+                voltage = rng.gauss(120.0, 1.5)
+                power_factor = min(1.0, max(0.5, rng.gauss(base_pf, 0.02)))
+                f.write(f"{ts},{device_id},{voltage:.1f},{current:.2f},{power_factor:.2f}\n")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    rows = generate_readings(args.output, args.devices, args.days, args.seed, args.malformed_rate)
+    print(f"Wrote {rows:,} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
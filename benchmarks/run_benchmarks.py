@@ -0,0 +1,166 @@
+"""
+Energy pipeline benchmark harness
+=================================
+
+Generates (or reuses) a synthetic dataset, then times each pipeline stage
+over several repetitions and reports rows/sec, latency percentiles and the
+peak memory each stage allocates (measured with tracemalloc in one extra,
+untimed run). The process-wide peak RSS is reported once per run, since it
+never goes down between stages. Results are saved as JSON so runs can be
+compared.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--devices 100] [--days 7] [--repeat 5]
+        [--malformed-rate 0.001] [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from generate_readings import generate_readings
+from services.analytics import EnergyAnalytics
+from services.data_ingestion import DataIngestionService
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100.0 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def peak_alloc_mb(func: Callable[[], object]) -> float:
+    """Peak Python memory allocated while running `func` once, in MiB."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def time_stage(func: Callable[[], object], repeat: int, rows: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    p50 = percentile(samples, 50)
+    return {
+        "runs": repeat,
+        "p50_ms": p50 * 1000,
+        "p90_ms": percentile(samples, 90) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "min_ms": min(samples) * 1000,
+        "rows_per_sec": rows / p50 if p50 else float("inf"),
+        "peak_alloc_mb": peak_alloc_mb(func),
+    }
+
+
+def run(csv_path: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    ingestion = DataIngestionService()
+    analytics = EnergyAnalytics()
+
+    readings = ingestion.load_file(csv_path)
+    batch = ingestion.load_batch(csv_path)
+    rows = len(batch)
+
+    stages = {
+        "ingest.load_file": lambda: ingestion.load_file(csv_path),
+        "ingest.load_batch": lambda: ingestion.load_batch(csv_path),
+        "score.list": lambda: analytics.calculate_complex_efficiency_score(readings),
+        "score.batch": lambda: analytics.calculate_complex_efficiency_score(batch),
+        "cost.list": lambda: analytics.project_monthly_cost(readings),
+        "cost.batch": lambda: analytics.project_monthly_cost(batch),
+        "score_and_cost.batch": lambda: analytics.calculate_score_and_cost(batch),
+    }
+    return {name: time_stage(func, repeat, rows) for name, func in stages.items()}
+
+
+def print_results(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'stage':<24} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'rows/s':>14} {'alloc MiB':>10}  vs baseline")
+    for name, r in results.items():
+        delta = ""
+        old = baseline.get(name)
+        if old and old["p50_ms"]:
+            delta = f"{(r['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100:+.1f}%"
+        print(
+            f"{name:<24} {r['p50_ms']:>10.2f} {r['p90_ms']:>10.2f} {r['p99_ms']:>10.2f} "
+            f"{r['rows_per_sec']:>14,.0f} {r['peak_alloc_mb']:>10.1f}  {delta}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--malformed-rate", type=float, default=0.001)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data", help="Use an existing readings CSV instead of generating one")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Previous JSON results to compare p50 latency against")
+    args = parser.parse_args()
+
+    generated = None
+    csv_path = args.data
+    if csv_path is None:
+        fd, generated = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        generate_readings(generated, args.devices, args.days, args.seed, args.malformed_rate)
+        csv_path = generated
+
+    try:
+        results = run(csv_path, args.repeat)
+    finally:
+        if generated:
+            os.remove(generated)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["stages"]
+    print_results(results, baseline)
+    peak_rss = peak_rss_mb()
+    print(f"peak RSS of the run: {peak_rss:.1f} MiB")
+
+    if args.output:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": {
+                "path": args.data,
+                "devices": args.devices,
+                "days": args.days,
+                "seed": args.seed,
+                "malformed_rate": args.malformed_rate,
+            },
+            "peak_rss_mb": peak_rss,
+            "stages": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,17 +10,321 @@ and use for learning purposes.
 No complex dependencies - just Python standard library!
 """
 
+import asyncio
+import base64
 import json
+import os
 import sys
-import csv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Tuple
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from datetime import datetime
+from models.device_totals import DeviceTotals
+from models.reading import from_epoch_seconds, to_epoch_seconds
+from models.reading_index import ReadingIndex
+from services.accumulators import DeviceTotalsAccumulator
+from services.analytics import EnergyAnalytics
+from services.data_ingestion import DataIngestionService
+from services.device_registry import DeviceRegistry
+from services.file_follower import ReadingFileFollower
+from services.search import DeviceSearchIndex
+from services.sqlite_store import SQLiteReadingStore
+
+DEFAULT_DATA_PATH = SRC_DIR / "data" / "readings.csv"
+DEFAULT_DEVICES_PATH = SRC_DIR / "data" / "devices.json"
+# Serve readings from a SQLite database (see services/sqlite_store.py) instead of the CSV.
+DB_PATH_ENV = "ENERGY_DB_PATH"
+MAX_PAGE_SIZE = 1000
+GROUP_KEYS = ("device_id", "location", "device_type")
+
+
+def load_registry(path: Path) -> DeviceRegistry:
+    """Load the device registry, or an empty one if the file is missing"""
+    try:
+        return DeviceRegistry.load(str(path))
+    except FileNotFoundError:
+        return DeviceRegistry()
+
+
+class ReadingCache:
+    """
+    Keeps the readings file parsed and indexed in memory.
+
+    The file is loaded on first use and only re-read when its modification
+    time or size changes, so tool calls normally never touch the disk beyond
+    a single stat(). When the file has only grown (gateways appending
+    readings), just the appended bytes are parsed and folded into per-device
+    running totals (see DeviceTotalsAccumulator), so a refresh costs
+    O(appended rows) however long the history is; any other change
+    (rewrite, truncation, rotation) triggers a full reload. Appends produce
+    a new index (see `ReadingIndex.extended`) and new tables that are
+    published by swapping references, so tool calls running concurrently
+    keep reading a consistent snapshot.
+
+    Per-device summaries and group tables are derived from DeviceTotals,
+    exactly as StoreCache derives them from SQL aggregates.
+    """
+
+    def __init__(self, path: Path, registry: DeviceRegistry):
+        self.path = Path(path)
+        self.registry = registry
+        self.index: Optional[ReadingIndex] = None
+        self.device_stats: Dict[str, dict] = {}
+        # Keyed by (data signature/version, group key), so a table computed
+        # from data that was replaced mid-call is never served afterwards.
+        self.group_tables: Dict[tuple, list] = {}
+        self.search_index = DeviceSearchIndex(registry, {})
+        self.loaded_at: Optional[float] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._follower: Optional[ReadingFileFollower] = None
+        self._accumulator = DeviceTotalsAccumulator()
+        self._totals: List[DeviceTotals] = []
+        # Whether the last load parsed a final line that had no newline yet.
+        self._flushed_tail = False
+        self._lock = threading.Lock()
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def refresh(self) -> bool:
+        """Reloads the file if it changed since the last load. Returns True on reload."""
+        signature = self._stat_signature()
+        if signature is not None and signature == self._signature:
+            return False
+
+        # Concurrent tool calls share one reload instead of each parsing the file.
+        with self._lock:
+            signature = self._stat_signature()
+            if signature is not None and signature == self._signature:
+                return False
+            if signature is None:
+                self._close_follower()
+                self.index = None
+                self._accumulator = DeviceTotalsAccumulator()
+                self._publish(None, None)
+            elif not self._append(signature):
+                self._close_follower()
+                self._follower = ReadingFileFollower(str(self.path))
+                batch = self._follower.poll()
+                self._flushed_tail = self._follower.has_partial_line
+                if self._flushed_tail:
+                    batch.extend(self._follower.flush())
+                index = ReadingIndex(batch)
+                # Fed per device in time order, like the rows of a full scan.
+                self._accumulator = DeviceTotalsAccumulator()
+                for device_id in index.device_ids():
+                    self._accumulator.update_batch(index.lookup(device_id))
+                self._publish(index, None)
+            self.search_index = DeviceSearchIndex(self.registry, self.device_stats)
+            self.group_tables = {}
+            self._signature = signature
+            self.loaded_at = time.time()
+        return True
+
+    def _append(self, signature: Tuple[int, int]) -> bool:
+        """Indexes only newly appended readings. Returns False if a full reload is needed."""
+        follower, index = self._follower, self.index
+        if follower is None or index is None or self._signature is None or signature[1] <= self._signature[1]:
+            return False
+        if self._flushed_tail:
+            # The unterminated last line may have been completed since.
+            return False
+        resets = follower.rotations + follower.truncations
+        batch = follower.poll()
+        if follower.rotations + follower.truncations != resets:
+            return False
+        index = index.extended(batch)
+        self._publish(index, self._accumulator.update_batch(batch))
+        return True
+
+    def _publish(self, index: Optional[ReadingIndex], touched: Optional[set]) -> None:
+        """Swaps in a new index and the tables derived from the accumulated totals."""
+        devices = self._accumulator.devices
+        stats = dict(self.device_stats) if touched is not None else {}
+        for device_id in (touched if touched is not None else devices):
+            t = devices[device_id]
+            if t.readings:
+                stats[device_id] = device_stats_row(t)
+        # Copies, since the accumulator keeps updating its totals in place.
+        totals = [replace(t) for t in devices.values() if t.readings]
+        self.index, self.device_stats, self._totals = index, stats, totals
+
+    def _close_follower(self) -> None:
+        if self._follower is not None:
+            self._follower.close()
+            self._follower = None
+
+    def get(self) -> Optional[ReadingIndex]:
+        """Returns the up-to-date index, or None if the data file is missing."""
+        self.refresh()
+        return self.index
+
+    def read_page(self, offset: int, limit: int, **filters) -> Tuple[List[tuple], Optional[int]]:
+        """Reads one page of rows straight from the file, resuming at a byte offset."""
+        return DataIngestionService().read_page(str(self.path), offset=offset, limit=limit, **filters)
+
+    def group_table(self, key: str) -> list:
+        """Returns per-group rows for `key`, computed once per data refresh."""
+        self.refresh()
+        with self._lock:
+            totals, signature = self._totals, self._signature
+        table = self.group_tables.get((signature, key))
+        if table is None:
+            table = group_rows(EnergyAnalytics().group_totals(totals, key, self.registry))
+            self.group_tables[(signature, key)] = table
+        return table
+
+
+class StoreCache:
+    """
+    Serves the same tables as ReadingCache from a SQLiteReadingStore.
+
+    Per-device and per-group summaries are computed by SQL aggregates over
+    the indexed table instead of from readings held in memory, and are
+    recomputed only when the store's data version changes. Tool calls read
+    through the store's pool of read-only connections, so they run
+    concurrently with each other and with writers importing into the store.
+    """
+
+    def __init__(self, path: Path, registry: DeviceRegistry):
+        self.path = Path(path)
+        self.registry = registry
+        self.store = SQLiteReadingStore(str(self.path))
+        self.device_stats: Dict[str, dict] = {}
+        # Keyed by (data signature/version, group key), so a table computed
+        # from data that was replaced mid-call is never served afterwards.
+        self.group_tables: Dict[tuple, list] = {}
+        self.search_index = DeviceSearchIndex(registry, {})
+        self.loaded_at: Optional[float] = None
+        self._totals: list = []
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Re-aggregates if readings were added since the last refresh. Returns True on reload."""
+        if self.store.data_version() == self._version:
+            return False
+        with self._lock:
+            version = self.store.data_version()
+            if version == self._version:
+                return False
+            totals = self.store.device_totals()
+            self.device_stats = {device_id: device_stats_row(t) for device_id, t in totals.items()}
+            self._totals = list(totals.values())
+            self.search_index = DeviceSearchIndex(self.registry, self.device_stats)
+            self.group_tables = {}
+            self._version = version
+            self.loaded_at = time.time()
+        return True
+
+    def read_page(self, offset: int, limit: int, **filters) -> Tuple[List[tuple], Optional[int]]:
+        """Reads one page of rows with an index range scan, resuming at a row id."""
+        return self.store.read_page(offset=offset, limit=limit, **filters)
+
+    def group_table(self, key: str) -> list:
+        """Returns per-group rows for `key`, computed once per data refresh."""
+        self.refresh()
+        with self._lock:
+            totals, version = self._totals, self._version
+        table = self.group_tables.get((version, key))
+        if table is None:
+            table = group_rows(EnergyAnalytics().group_totals(totals, key, self.registry))
+            self.group_tables[(version, key)] = table
+        return table
+
+
+def device_stats_row(t: DeviceTotals) -> dict:
+    """Formats one device's totals (with at least one reading) for tool output."""
+    return {
+        "readings": t.readings,
+        "invalid_readings": t.invalid_readings,
+        "avg_power_watts": round(t.power_sum_watts / t.readings, 2),
+        "peak_power_watts": round(t.peak_watts, 2),
+        "avg_power_factor": round(t.power_factor_sum / t.readings, 4),
+        "kwh": round(t.energy_wh / 1000.0, 4),
+        "efficiency_score": round(t.efficiency_sum / t.readings, 4),
+        "projected_monthly_cost": round(EnergyAnalytics().monthly_cost_from_totals(t.power_sum_watts, t.readings), 2),
+        "last_reading": str(from_epoch_seconds(t.last_timestamp)),
+    }
+
+
+def group_rows(summaries: list) -> list:
+    """Formats GroupSummary objects for tool output."""
+    return [
+        {
+            "group": s.key,
+            "readings": s.readings,
+            "efficiency_score": round(s.efficiency_score, 4),
+            "avg_power_watts": round(s.avg_power_watts, 2),
+            "kwh": round(s.kwh, 4),
+            "projected_monthly_cost": round(s.projected_monthly_cost, 2),
+        }
+        for s in summaries
+    ]
+
+
+def row_to_dict(row: tuple) -> dict:
+    """Formats one parsed (epoch, device_id, voltage, current, pf) row for tool output."""
+    epoch, device_id, voltage, current, power_factor = row
+    return {
+        "timestamp": str(from_epoch_seconds(epoch)),
+        "device_id": device_id,
+        "voltage": voltage,
+        "current": current,
+        "power_factor": power_factor,
+    }
+
+
+def encode_cursor(offset: int, row_index: int) -> str:
+    """Pack a file offset and row index into an opaque cursor string"""
+    raw = json.dumps({"o": offset, "r": row_index}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Unpack a cursor produced by encode_cursor into (offset, row_index)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(data["o"]), int(data["r"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_time_arg(value: Optional[str]) -> Optional[int]:
+    """Convert an ISO date/time argument into epoch seconds"""
+    if not value:
+        return None
+    return to_epoch_seconds(datetime.fromisoformat(value))
+
 
 # Simple MCP Server Implementation (no external dependencies!)
 class SimpleMCPServer:
-    def __init__(self, name: str):
+    def __init__(
+        self,
+        name: str,
+        data_path: Path = DEFAULT_DATA_PATH,
+        devices_path: Path = DEFAULT_DEVICES_PATH,
+        db_path: Optional[Path] = None,
+    ):
         self.name = name
         self.tools = []
+        self.registry = load_registry(devices_path)
+        if db_path is not None:
+            self.cache = StoreCache(db_path, self.registry)
+        else:
+            self.cache = ReadingCache(data_path, self.registry)
         
     def handle_request(self, request: dict) -> dict:
         """Handle MCP protocol requests"""
@@ -53,25 +357,37 @@ class SimpleMCPServer:
         if name == "get_devices":
             return self.get_devices()
         elif name == "get_readings":
-            return self.get_readings(args.get("limit", 10))
+            return self.get_readings(
+                args.get("limit", 10),
+                cursor=args.get("cursor"),
+                device_id=args.get("device_id"),
+                start=args.get("start"),
+                end=args.get("end"),
+            )
         elif name == "get_device_summary":
             return self.get_device_summary(args.get("device_id"))
+        elif name == "get_all_device_summaries":
+            return self.get_all_device_summaries()
+        elif name == "get_group_summaries":
+            return self.get_group_summaries(args.get("group_by", "device_id"))
         elif name == "search_data":
-            return self.search_data(args.get("query", ""))
+            return self.search_data(args.get("query", ""), args.get("limit", 10))
         
         return {"error": f"Unknown tool: {name}"}
     
     def get_devices(self) -> dict:
-        """Get list of all devices from the models"""
-        # Simple hardcoded device data for demo
+        """Get list of all devices from the device registry"""
         devices = [
-            {"id": "DEV001", "name": "Smart Thermostat", "type": "HVAC"},
-            {"id": "DEV002", "name": "Living Room Lights", "type": "Lighting"},
-            {"id": "DEV003", "name": "Kitchen Refrigerator", "type": "Appliance"},
-            {"id": "DEV004", "name": "Water Heater", "type": "HVAC"},
-            {"id": "DEV005", "name": "Bedroom AC", "type": "HVAC"}
+            {
+                "id": d.device_id,
+                "name": d.name,
+                "type": d.device_type,
+                "location": d.location,
+                "power_rating_watts": d.power_rating_watts,
+                "is_active": d.is_active,
+            }
+            for d in self.registry
         ]
-        
         return {
             "content": [
                 {
@@ -81,19 +397,16 @@ class SimpleMCPServer:
             ]
         }
     
-    def get_readings(self, limit: int = 10) -> dict:
-        """Get recent energy readings from CSV"""
-        csv_path = Path(__file__).parent.parent / "data" / "readings.csv"
-        
-        readings = []
-        try:
-            with open(csv_path, 'r') as f:
-                reader = csv.DictReader(f)
-                for i, row in enumerate(reader):
-                    if i >= limit:
-                        break
-                    readings.append(row)
-        except FileNotFoundError:
+    def get_readings(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        device_id: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> dict:
+        """Get one page of energy readings, optionally filtered, as compact JSON"""
+        if not self.cache.path.exists():
             return {
                 "content": [{
                     "type": "text",
@@ -104,11 +417,26 @@ class SimpleMCPServer:
                     ], indent=2)
                 }]
             }
-        
+
+        offset, row_index = decode_cursor(cursor) if cursor else (0, 0)
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        rows, next_offset = self.cache.read_page(
+            offset=offset,
+            limit=limit,
+            device_id=device_id,
+            start=parse_time_arg(start),
+            end=parse_time_arg(end),
+        )
+        row_index += len(rows)
+        page = {
+            "count": len(rows),
+            "readings": [row_to_dict(row) for row in rows],
+            "next_cursor": encode_cursor(next_offset, row_index) if next_offset is not None else None,
+        }
         return {
             "content": [{
                 "type": "text",
-                "text": f"Latest {len(readings)} readings:\n" + json.dumps(readings, indent=2)
+                "text": json.dumps(page, separators=(",", ":"))
             }]
         }
     
@@ -122,13 +450,19 @@ class SimpleMCPServer:
                 }]
             }
         
-        summary = {
-            "device_id": device_id,
-            "status": "active",
-            "avg_consumption": "2.3 kWh",
-            "efficiency_score": 85,
-            "last_reading": "2024-01-15 14:30"
-        }
+        self.cache.refresh()
+        stats = self.cache.device_stats.get(device_id)
+        if stats is None:
+            return {
+                "content": [{
+                    "type": "text",
+                    "text": f"No readings found for device {device_id}"
+                }]
+            }
+
+        device = self.registry.get(device_id)
+        status = "inactive" if device is not None and not device.is_active else "active"
+        summary = {"device_id": device_id, "status": status, **stats}
         
         return {
             "content": [{
@@ -137,33 +471,63 @@ class SimpleMCPServer:
             }]
         }
     
-    def search_data(self, query: str) -> dict:
-        """Search through energy data"""
-        results = f"Search results for: '{query}'\n\n"
-        
-        if "hvac" in query.lower() or "thermostat" in query.lower():
-            results += "Found HVAC devices:\n"
-            results += "- DEV001: Smart Thermostat (avg: 3.2 kWh)\n"
-            results += "- DEV004: Water Heater (avg: 4.5 kWh)\n"
-            results += "- DEV005: Bedroom AC (avg: 2.8 kWh)\n"
-        elif "high" in query.lower() or "consumption" in query.lower():
-            results += "Devices with high consumption:\n"
-            results += "- DEV004: Water Heater (4.5 kWh - highest)\n"
-            results += "- DEV001: Smart Thermostat (3.2 kWh)\n"
-        else:
-            results += "Try searching for: 'HVAC', 'high consumption', 'efficiency'\n"
+    def get_all_device_summaries(self) -> dict:
+        """Get the precomputed summary of every device in one call"""
+        self.cache.refresh()
+        summaries = [{"device_id": device_id, **stats} for device_id, stats in self.cache.device_stats.items()]
+        return {
+            "content": [{
+                "type": "text",
+                "text": json.dumps(summaries, separators=(",", ":"))
+            }]
+        }
+    
+    def get_group_summaries(self, group_by: str = "device_id") -> dict:
+        """Get efficiency, power, kWh and cost per device, location or device type"""
+        if group_by not in GROUP_KEYS:
+            return {
+                "content": [{
+                    "type": "text",
+                    "text": f"group_by must be one of: {', '.join(GROUP_KEYS)}"
+                }]
+            }
+        return {
+            "content": [{
+                "type": "text",
+                "text": json.dumps(self.cache.group_table(group_by), separators=(",", ":"))
+            }]
+        }
+    
+    def search_data(self, query: str, limit: int = 10) -> dict:
+        """Search devices by name/type/location and numeric predicates"""
+        self.cache.refresh()
+        results = self.cache.search_index.search(query, limit=max(1, int(limit)))
+
+        text = f"Search results for: '{query}'\n\n"
+        if not results:
+            text += "No matching devices. Try 'HVAC', 'kitchen', 'high consumption' or 'power > 2kW'\n"
+        for r in results:
+            name = r.device.name if r.device else "Unknown device"
+            detail = "no readings"
+            if r.stats:
+                detail = (
+                    f"avg {r.stats['avg_power_watts']} W, peak {r.stats['peak_power_watts']} W, "
+                    f"pf {r.stats['avg_power_factor']}, {r.stats['kwh']} kWh"
+                )
+            text += f"- {r.device_id}: {name} ({detail})\n"
         
         return {
             "content": [{
                 "type": "text",
-                "text": results
+                "text": text
             }]
         }
 
 
 # Define available tools
 def create_energy_server():
-    server = SimpleMCPServer("energy-data")
+    db_path = os.environ.get(DB_PATH_ENV)
+    server = SimpleMCPServer("energy-data", db_path=Path(db_path) if db_path else None)
     
     server.tools = [
         {
@@ -177,13 +541,29 @@ def create_energy_server():
         },
         {
             "name": "get_readings",
-            "description": "Get recent energy readings from devices",
+            "description": "Get energy readings page by page, optionally filtered by device and time range",
             "inputSchema": {
                 "type": "object",
                 "properties": {
                     "limit": {
                         "type": "number",
-                        "description": "Number of readings to return (default: 10)"
+                        "description": f"Number of readings to return (default: 10, max: {MAX_PAGE_SIZE})"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from a previous page, to continue where it stopped"
+                    },
+                    "device_id": {
+                        "type": "string",
+                        "description": "Only return readings for this device (e.g., DEV001)"
+                    },
+                    "start": {
+                        "type": "string",
+                        "description": "Only return readings at or after this time (e.g., 2023-10-01 08:00:00)"
+                    },
+                    "end": {
+                        "type": "string",
+                        "description": "Only return readings before this time"
                     }
                 },
                 "required": []
@@ -203,6 +583,30 @@ def create_energy_server():
                 "required": ["device_id"]
             }
         },
+        {
+            "name": "get_all_device_summaries",
+            "description": "Get summary statistics for every device in one call",
+            "inputSchema": {
+                "type": "object",
+                "properties": {},
+                "required": []
+            }
+        },
+        {
+            "name": "get_group_summaries",
+            "description": "Get efficiency, average power, kWh and projected cost per device, location or device type",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "group_by": {
+                        "type": "string",
+                        "enum": list(GROUP_KEYS),
+                        "description": "Grouping key (default: device_id)"
+                    }
+                },
+                "required": []
+            }
+        },
         {
             "name": "search_data",
             "description": "Search through energy data and devices",
@@ -211,7 +615,11 @@ def create_energy_server():
                 "properties": {
                     "query": {
                         "type": "string",
-                        "description": "Search query (e.g., 'HVAC', 'high consumption')"
+                        "description": "Search query (e.g., 'HVAC', 'high consumption', 'power > 2kW', 'pf < 0.9')"
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of results (default: 10)"
                     }
                 },
                 "required": ["query"]
@@ -222,28 +630,101 @@ def create_energy_server():
     return server
 
 
+# Methods cheap enough to answer directly on the event loop; everything else
+# (tool calls) runs in the worker pool.
+INLINE_METHODS = {"initialize", "tools/list"}
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_WORKERS = 8
+
+
+def make_response(request_id: Any, result: Any = None, error: Optional[dict] = None) -> dict:
+    """Build a JSON-RPC 2.0 response envelope"""
+    response = {"jsonrpc": "2.0", "id": request_id}
+    if error is not None:
+        response["error"] = error
+    else:
+        response["result"] = result
+    return response
+
+
+async def serve(
+    server: SimpleMCPServer,
+    stdin=None,
+    stdout=None,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    workers: int = DEFAULT_WORKERS,
+) -> None:
+    """
+    Concurrent stdio server loop.
+
+    Requests are read as they arrive and tool calls are handed to a thread
+    pool, so a slow call does not block the rest of the pipe. Responses are
+    written as soon as they complete, correlated by JSON-RPC `id` (requests
+    without an id are notifications and get no response). At most
+    `max_in_flight` requests are processed at once; beyond that, reading
+    from stdin pauses until a slot frees up.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_in_flight)
+    pending = set()
+
+    def write(response: dict) -> None:
+        stdout.write(json.dumps(response) + "\n")
+        stdout.flush()
+
+    async def process(request: dict) -> None:
+        try:
+            if request.get("method") in INLINE_METHODS:
+                result = server.handle_request(request)
+            else:
+                result = await loop.run_in_executor(pool, server.handle_request, request)
+            response = make_response(request.get("id"), result)
+        except Exception as e:
+            response = make_response(request.get("id"), error={"code": -32603, "message": str(e)})
+        finally:
+            slots.release()
+        if "id" in request:
+            write(response)
+
+    with ThreadPoolExecutor(max_workers=1) as reader, ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            await slots.acquire()
+            line = await loop.run_in_executor(reader, stdin.readline)
+            if not line:
+                slots.release()
+                break
+            if not line.strip():
+                slots.release()
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                slots.release()
+                write(make_response(None, error={"code": -32700, "message": "Invalid JSON"}))
+                continue
+            if not isinstance(request, dict):
+                slots.release()
+                write(make_response(None, error={"code": -32600, "message": "Request must be a JSON object"}))
+                continue
+            task = asyncio.create_task(process(request))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+
 def main():
     """Main MCP server loop"""
     server = create_energy_server()
     
     print("Energy Data MCP Server started", file=sys.stderr)
-    print("Available tools: get_devices, get_readings, get_device_summary, search_data", file=sys.stderr)
+    print("Available tools: get_devices, get_readings, get_device_summary, get_all_device_summaries, get_group_summaries, search_data", file=sys.stderr)
     
-    # Simple stdio-based MCP protocol
-    for line in sys.stdin:
-        try:
-            request = json.loads(line)
-            response = server.handle_request(request)
-            print(json.dumps(response))
-            sys.stdout.flush()
-        except json.JSONDecodeError:
-            error = {"error": "Invalid JSON"}
-            print(json.dumps(error))
-            sys.stdout.flush()
-        except Exception as e:
-            error = {"error": str(e)}
-            print(json.dumps(error))
-            sys.stdout.flush()
+    # Simple stdio-based MCP protocol, with requests handled concurrently
+    asyncio.run(serve(server))
 
 
 if __name__ == "__main__":
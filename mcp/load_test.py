@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Load test for the Energy Data MCP server
+========================================
+
+Starts `energy_data_server.py` as a subprocess, pipelines thousands of
+JSON-RPC requests into its stdin without waiting for replies, and checks
+that every request id is answered exactly once.
+
+Usage:
+    python mcp/load_test.py [--requests 5000]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+SERVER = Path(__file__).resolve().parent / "energy_data_server.py"
+
+TOOL_CALLS = [
+    ("get_devices", {}),
+    ("get_readings", {"limit": 5}),
+    ("get_device_summary", {"device_id": "DEV001"}),
+    ("search_data", {"query": "high consumption"}),
+]
+
+
+def build_request(request_id: int) -> dict:
+    name, arguments = TOOL_CALLS[request_id % len(TOOL_CALLS)]
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": name, "arguments": arguments},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    proc = subprocess.Popen(
+        [sys.executable, str(SERVER)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    sent_at = {}
+
+    def send_all():
+        for request_id in range(args.requests):
+            sent_at[request_id] = time.perf_counter()
+            proc.stdin.write(json.dumps(build_request(request_id)) + "\n")
+        proc.stdin.close()
+
+    start = time.perf_counter()
+    writer = threading.Thread(target=send_all)
+    writer.start()
+
+    latencies = []
+    seen = set()
+    errors = 0
+    for line in proc.stdout:
+        response = json.loads(line)
+        request_id = response.get("id")
+        if request_id not in sent_at:
+            # e.g. a parse error, which the server reports with "id": null
+            print(f"Response for unknown id {request_id!r}: {response.get('error')}", file=sys.stderr)
+            errors += 1
+            continue
+        if request_id in seen:
+            print(f"Duplicate response for id {request_id}", file=sys.stderr)
+            errors += 1
+        seen.add(request_id)
+        if "error" in response:
+            errors += 1
+        latencies.append(time.perf_counter() - sent_at[request_id])
+    elapsed = time.perf_counter() - start
+    writer.join()
+    proc.wait()
+
+    missing = args.requests - len(seen)
+    latencies.sort()
+    print(f"requests:   {args.requests}")
+    print(f"responses:  {len(seen)} (missing {missing}, errors {errors})")
+    print(f"throughput: {len(latencies) / elapsed:,.0f} req/s")
+    if latencies:
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        print(f"latency:    p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+    sys.exit(1 if missing or errors else 0)
+
+
+if __name__ == "__main__":
+    main()
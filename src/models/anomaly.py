@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Anomaly:
+    device_id: str
+    timestamp: int  # epoch seconds
+    power_watts: float
+    reason: str  # "spike" or "invalid"
+    z_score: Optional[float] = None  # None for invalid readings
@@ -1,10 +1,15 @@
+import sys
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class Device:
     device_id: str
     name: str
     location: str
     power_rating_watts: float
     is_active: bool = False
+    device_type: str = ""
+
+    def __post_init__(self):
+        self.device_id = sys.intern(self.device_id)
@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class DeviceTotals:
+    """Per-device sums from which summaries are derived without the raw readings."""
+    device_id: str
+    readings: int
+    efficiency_sum: float
+    power_sum_watts: float
+    peak_watts: float
+    power_factor_sum: float
+    energy_wh: float
+    first_timestamp: int  # epoch seconds
+    last_timestamp: int  # epoch seconds
+    invalid_readings: int = 0  # readings left out of the sums, see kernels.valid_rows
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from typing import Hashable
+
+
+@dataclass
+class GroupSummary:
+    key: Hashable
+    readings: int
+    efficiency_score: float
+    avg_power_watts: float
+    kwh: float
+    projected_monthly_cost: float
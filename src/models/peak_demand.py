@@ -0,0 +1,8 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class PeakDemand:
+    device_id: str
+    start: int  # demand interval start, epoch seconds
+    avg_watts: float
@@ -1,10 +1,88 @@
+import sys
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from numbers import Integral
+from typing import Union
 
-@dataclass
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_seconds(timestamp: datetime) -> int:
+    """
+    Converts a datetime into integer epoch seconds.
+
+    Naive datetimes are taken to be UTC; aware ones are converted to UTC.
+    """
+    if timestamp.utcoffset() is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - EPOCH) // timedelta(seconds=1)
+
+
+def from_epoch_seconds(seconds: int) -> datetime:
+    """Converts integer epoch seconds back into a naive (UTC) datetime."""
+    return EPOCH + timedelta(seconds=seconds)
+
+
+class _EpochTimestamp:
+    """Exposes the `epoch_seconds` slot as a `timestamp` datetime attribute."""
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return from_epoch_seconds(obj.epoch_seconds)
+
+    def __set__(self, obj, value: Union[datetime, int]) -> None:
+        if isinstance(value, datetime):
+            obj.epoch_seconds = to_epoch_seconds(value)
+        elif isinstance(value, Integral) and not isinstance(value, bool):
+            obj.epoch_seconds = int(value)
+        else:
+            raise TypeError(f"timestamp must be a datetime or epoch seconds, not {type(value).__name__}")
+
+
+@dataclass(init=False)
 class EnergyReading:
+    """
+    One meter reading.
+
+    Stored compactly for code paths that still need row objects: slotted,
+    with the timestamp held as integer epoch seconds (the `timestamp`
+    datetime is built on access, and may be set from a datetime or epoch
+    seconds) and the device id interned, so every reading of a device
+    shares one string. The dataclass fields are still `timestamp`,
+    `device_id`, `voltage`, `current` and `power_factor`, so `replace`,
+    `asdict` and the repr work as before.
+    """
+
+    __slots__ = ("epoch_seconds", "device_id", "voltage", "current", "power_factor")
+
     timestamp: datetime
     device_id: str
     voltage: float
     current: float
     power_factor: float
+
+    def __init__(
+        self,
+        timestamp: Union[datetime, int],
+        device_id: str,
+        voltage: float,
+        current: float,
+        power_factor: float,
+    ):
+        """
+        Raises:
+            TypeError: If timestamp is neither a datetime nor integer epoch
+                seconds.
+        """
+        self.timestamp = timestamp
+        self.device_id = sys.intern(device_id)
+        self.voltage = voltage
+        self.current = current
+        self.power_factor = power_factor
+
+
+# Attached after @dataclass has collected the fields, so that `timestamp`
+# stays a plain field without a default while reads and writes of it go
+# through the epoch_seconds slot.
+EnergyReading.timestamp = _EpochTimestamp()
@@ -0,0 +1,240 @@
+from array import array
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from models.reading import EnergyReading, to_epoch_seconds
+
+if TYPE_CHECKING:
+    import numpy
+
+
+class ReadingBatch:
+    """
+    Columnar store for energy readings.
+
+    Each field lives in its own contiguous column: int64 epoch seconds for
+    timestamps, float64 for voltage/current/power factor, and an int32 code
+    column that points into a per-batch device dictionary. Row-level
+    EnergyReading objects are only built on demand.
+    """
+
+    def __init__(
+        self,
+        timestamps: Optional[Sequence[int]] = None,
+        device_codes: Optional[Sequence[int]] = None,
+        device_ids: Optional[List[str]] = None,
+        voltage: Optional[Sequence[float]] = None,
+        current: Optional[Sequence[float]] = None,
+        power_factor: Optional[Sequence[float]] = None,
+    ):
+        self.timestamps = timestamps if timestamps is not None else array('q')
+        self.device_codes = device_codes if device_codes is not None else array('i')
+        self.device_ids: List[str] = device_ids if device_ids is not None else []
+        self.voltage = voltage if voltage is not None else array('d')
+        self.current = current if current is not None else array('d')
+        self.power_factor = power_factor if power_factor is not None else array('d')
+        self._device_lookup: Dict[str, int] = {d: i for i, d in enumerate(self.device_ids)}
+
+        n = len(self.timestamps)
+        if not (len(self.device_codes) == len(self.voltage) == len(self.current) == len(self.power_factor) == n):
+            raise ValueError("All reading columns must have the same length")
+
+    @classmethod
+    def from_readings(cls, readings: Iterable[EnergyReading]) -> "ReadingBatch":
+        """Builds a batch from row-level EnergyReading objects."""
+        batch = cls()
+        for r in readings:
+            batch.append_epoch(r.epoch_seconds, r.device_id, r.voltage, r.current, r.power_factor)
+        return batch
+
+    def encode_device(self, device_id: str) -> int:
+        """Returns the dictionary code for a device id, adding it if unseen."""
+        code = self._device_lookup.get(device_id)
+        if code is None:
+            code = len(self.device_ids)
+            self.device_ids.append(device_id)
+            self._device_lookup[device_id] = code
+        return code
+
+    def device_code(self, device_id: str) -> Optional[int]:
+        """Returns the dictionary code for a device id, or None if absent."""
+        return self._device_lookup.get(device_id)
+
+    def append(self, timestamp: datetime, device_id: str, voltage: float, current: float, power_factor: float) -> None:
+        """
+        Appends one reading.
+
+        Args:
+            timestamp: Reading time, naive UTC.
+            device_id: The device id; encoded into the device dictionary.
+            voltage: Volts.
+            current: Amps.
+            power_factor: Power factor, normally within [-1, 1].
+        """
+        self.append_epoch(to_epoch_seconds(timestamp), device_id, voltage, current, power_factor)
+
+    def append_epoch(self, epoch_seconds: int, device_id: str, voltage: float, current: float, power_factor: float) -> None:
+        """
+        Appends one reading whose timestamp is already in epoch seconds.
+
+        Args:
+            epoch_seconds: Reading time as UTC epoch seconds.
+            device_id: The device id; encoded into the device dictionary.
+            voltage: Volts.
+            current: Amps.
+            power_factor: Power factor, normally within [-1, 1].
+        """
+        self.timestamps.append(epoch_seconds)
+        self.device_codes.append(self.encode_device(device_id))
+        self.voltage.append(voltage)
+        self.current.append(current)
+        self.power_factor.append(power_factor)
+
+    def extend_rows(self, rows: Iterable[Tuple[int, str, float, float, float]]) -> None:
+        """Appends (epoch_seconds, device_id, voltage, current, power_factor) rows."""
+        add_ts, add_code = self.timestamps.append, self.device_codes.append
+        add_v, add_c, add_pf = self.voltage.append, self.current.append, self.power_factor.append
+        lookup, encode = self._device_lookup, self.encode_device
+        for epoch_seconds, device_id, voltage, current, power_factor in rows:
+            code = lookup.get(device_id)
+            add_ts(epoch_seconds)
+            add_code(code if code is not None else encode(device_id))
+            add_v(voltage)
+            add_c(current)
+            add_pf(power_factor)
+
+    def extend(self, other: "ReadingBatch") -> None:
+        """Appends all rows of another batch, re-mapping its device codes."""
+        remap = array('i', (self.encode_device(d) for d in other.device_ids))
+        self.timestamps.extend(other.timestamps)
+        if all(code == i for i, code in enumerate(remap)):
+            self.device_codes.extend(other.device_codes)
+        else:
+            self.device_codes.extend(array('i', (remap[c] for c in other.device_codes)))
+        self.voltage.extend(other.voltage)
+        self.current.extend(other.current)
+        self.power_factor.extend(other.power_factor)
+
+    def head(self, n: int) -> "ReadingBatch":
+        """
+        Returns a new batch holding the first `n` rows.
+
+        Columns are sliced rather than taken row by row, so this is a block
+        copy. Rows appended to this batch later never show up in the result.
+        """
+        return ReadingBatch(
+            timestamps=self.timestamps[:n],
+            device_codes=self.device_codes[:n],
+            device_ids=list(self.device_ids),
+            voltage=self.voltage[:n],
+            current=self.current[:n],
+            power_factor=self.power_factor[:n],
+        )
+
+    def take(self, indices: Iterable[int]) -> "ReadingBatch":
+        """
+        Returns a new batch holding the given rows, in the given order.
+
+        The new batch's device dictionary only holds the devices of the taken
+        rows, so taking a few rows costs O(rows taken) regardless of how many
+        devices this batch has.
+        """
+        indices = list(indices)
+        ts, codes = self.timestamps, self.device_codes
+        v, c, pf = self.voltage, self.current, self.power_factor
+        remap: Dict[int, int] = {}
+        new_codes = array('i')
+        for i in indices:
+            code = codes[i]
+            new_code = remap.get(code)
+            if new_code is None:
+                new_code = remap[code] = len(remap)
+            new_codes.append(new_code)
+        return ReadingBatch(
+            timestamps=array('q', [ts[i] for i in indices]),
+            device_codes=new_codes,
+            device_ids=[self.device_ids[code] for code in remap],
+            voltage=array('d', [v[i] for i in indices]),
+            current=array('d', [c[i] for i in indices]),
+            power_factor=array('d', [pf[i] for i in indices]),
+        )
+
+    def is_time_sorted(self) -> bool:
+        """Returns True if timestamps never decrease from one row to the next."""
+        ts = self.timestamps
+        return all(a <= b for a, b in zip(ts, ts[1:]))
+
+    def sorted_by_time(self) -> "ReadingBatch":
+        """Returns a copy ordered by timestamp (stable for equal timestamps)."""
+        ts = self.timestamps
+        return self.take(sorted(range(len(ts)), key=ts.__getitem__))
+
+    def to_buffers(self) -> Dict[str, object]:
+        """
+        Serializes the batch as raw column bytes plus the device dictionary.
+
+        This is far cheaper to pickle (e.g. across process boundaries) than a
+        list of EnergyReading objects.
+        """
+        return {
+            "timestamps": bytes(self.timestamps),
+            "device_codes": bytes(self.device_codes),
+            "device_ids": list(self.device_ids),
+            "voltage": bytes(self.voltage),
+            "current": bytes(self.current),
+            "power_factor": bytes(self.power_factor),
+        }
+
+    @classmethod
+    def from_buffers(cls, buffers: Dict[str, object]) -> "ReadingBatch":
+        """Rebuilds a batch produced by `to_buffers`."""
+        def column(typecode: str, data: bytes) -> array:
+            col = array(typecode)
+            col.frombytes(data)
+            return col
+
+        return cls(
+            timestamps=column('q', buffers["timestamps"]),
+            device_codes=column('i', buffers["device_codes"]),
+            device_ids=list(buffers["device_ids"]),
+            voltage=column('d', buffers["voltage"]),
+            current=column('d', buffers["current"]),
+            power_factor=column('d', buffers["power_factor"]),
+        )
+
+    def device_id_at(self, index: int) -> str:
+        return self.device_ids[self.device_codes[index]]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, index: int) -> EnergyReading:
+        return EnergyReading(
+            timestamp=self.timestamps[index],
+            device_id=self.device_ids[self.device_codes[index]],
+            voltage=self.voltage[index],
+            current=self.current[index],
+            power_factor=self.power_factor[index],
+        )
+
+    def __iter__(self) -> Iterator[EnergyReading]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_readings(self) -> List[EnergyReading]:
+        """Materializes every row as an EnergyReading."""
+        return list(self)
+
+    def to_numpy(self) -> Dict[str, "numpy.ndarray"]:
+        """
+        Returns the columns as NumPy arrays sharing this batch's memory.
+        Requires NumPy to be installed.
+        """
+        import numpy as np
+
+        return {
+            "timestamps": np.frombuffer(self.timestamps, dtype=np.int64),
+            "device_codes": np.frombuffer(self.device_codes, dtype=np.int32),
+            "voltage": np.frombuffer(self.voltage, dtype=np.float64),
+            "current": np.frombuffer(self.current, dtype=np.float64),
+            "power_factor": np.frombuffer(self.power_factor, dtype=np.float64),
+        }
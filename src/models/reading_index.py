@@ -0,0 +1,138 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from models.reading import to_epoch_seconds
+from models.reading_batch import ReadingBatch
+
+
+class ReadingIndex:
+    """
+    Per-device partitioned index over a ReadingBatch.
+
+    Row positions are grouped by device and each group is kept sorted by
+    timestamp, so "all readings for device X between T1 and T2" is two
+    bisections plus a slice instead of a full scan.
+    """
+
+    def __init__(self, batch: ReadingBatch):
+        self.batch = batch
+        self._size = len(batch)
+        ts = batch.timestamps
+
+        groups: Dict[int, List[int]] = {}
+        for i, code in enumerate(batch.device_codes):
+            group = groups.get(code)
+            if group is None:
+                groups[code] = group = []
+            group.append(i)
+
+        self._rows: Dict[str, array] = {}
+        self._times: Dict[str, array] = {}
+        for code, rows in groups.items():
+            rows.sort(key=ts.__getitem__)
+            device_id = batch.device_ids[code]
+            self._rows[device_id] = array('q', rows)
+            self._times[device_id] = array('q', (ts[i] for i in rows))
+
+    def extended(self, batch: ReadingBatch) -> "ReadingIndex":
+        """
+        Returns a new index over this index's readings plus `batch`.
+
+        The rows are appended to the indexed batch in place, which is then
+        shared by both indexes. Rows are only ever appended, so everything
+        this index refers to stays where it is: `rows`, `count` and `lookup`
+        keep answering from this index's readings, and `len` keeps counting
+        them, while other threads swap in the new index. Per-device arrays
+        are copied only for devices that received readings. Readings newer
+        than everything indexed for their device (the normal case for
+        appended data) cost O(1) each; older ones are inserted in time order.
+
+        Code reading the whole `batch` of an index that may still be
+        extended (e.g. from another thread) should copy its first
+        `len(index)` rows with `ReadingBatch.head` first.
+
+        Raises:
+            ValueError: If this index was already extended; only the newest
+                index over a batch can be.
+        """
+        if len(self.batch) != self._size:
+            raise ValueError("Only the newest index over a batch can be extended")
+        combined = self.batch
+        first = len(combined)
+        combined.extend(batch)
+
+        index = ReadingIndex.__new__(ReadingIndex)
+        index.batch = combined
+        index._size = len(combined)
+        index._rows = dict(self._rows)
+        index._times = dict(self._times)
+        copied = set()
+        ts, codes, device_ids = combined.timestamps, combined.device_codes, combined.device_ids
+        for i in range(first, index._size):
+            device_id = device_ids[codes[i]]
+            t = ts[i]
+            times = index._times.get(device_id)
+            if times is None:
+                index._rows[device_id] = array('q', [i])
+                index._times[device_id] = array('q', [t])
+                copied.add(device_id)
+                continue
+            if device_id not in copied:
+                index._rows[device_id] = array('q', index._rows[device_id])
+                index._times[device_id] = times = array('q', times)
+                copied.add(device_id)
+            if times[-1] <= t:
+                index._rows[device_id].append(i)
+                times.append(t)
+            else:
+                pos = bisect_right(times, t)
+                index._rows[device_id].insert(pos, i)
+                times.insert(pos, t)
+        return index
+
+    def device_ids(self) -> List[str]:
+        """Returns the ids of all devices with at least one reading."""
+        return list(self._rows)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._rows
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _bounds(self, device_id: str, start: Optional[datetime], end: Optional[datetime]) -> Tuple[int, int]:
+        times = self._times.get(device_id)
+        if times is None:
+            return 0, 0
+        lo = bisect_left(times, to_epoch_seconds(start)) if start is not None else 0
+        hi = bisect_left(times, to_epoch_seconds(end)) if end is not None else len(times)
+        return lo, max(lo, hi)
+
+    def rows(self, device_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> array:
+        """
+        Returns batch row positions for a device in [start, end), oldest first.
+        Missing bounds are open-ended; unknown devices yield no rows.
+        """
+        lo, hi = self._bounds(device_id, start, end)
+        rows = self._rows.get(device_id)
+        return rows[lo:hi] if rows is not None else array('q')
+
+    def count(self, device_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        """
+        Counts a device's readings in [start, end) without materializing them.
+
+        Args:
+            device_id: The device to count.
+            start: Inclusive lower time bound, or None for no bound.
+            end: Exclusive upper time bound, or None for no bound.
+
+        Returns:
+            The number of matching readings; 0 for unknown devices.
+        """
+        lo, hi = self._bounds(device_id, start, end)
+        return hi - lo
+
+    def lookup(self, device_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> ReadingBatch:
+        """Returns the readings of one device in [start, end) as a new batch."""
+        return self.batch.take(self.rows(device_id, start, end))
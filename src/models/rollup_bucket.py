@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RollupBucket:
+    device_id: str
+    start: int  # window start, epoch seconds
+    readings: int = 0
+    power_sum_watts: float = 0.0
+    peak_watts: Optional[float] = None  # None until the bucket has a reading
+    power_factor_sum: float = 0.0
+    energy_wh: float = 0.0
+    covered_seconds: float = 0.0
+
+    @property
+    def kwh(self) -> float:
+        return self.energy_wh / 1000.0
+
+    @property
+    def avg_watts(self) -> float:
+        return self.power_sum_watts / self.readings if self.readings else 0.0
+
+    @property
+    def power_factor_mean(self) -> float:
+        return self.power_factor_sum / self.readings if self.readings else 0.0
+
+    def merge(self, other: "RollupBucket") -> None:
+        """Folds a finer-grained bucket into this one."""
+        self.readings += other.readings
+        self.power_sum_watts += other.power_sum_watts
+        if other.peak_watts is not None and (self.peak_watts is None or other.peak_watts > self.peak_watts):
+            self.peak_watts = other.peak_watts
+        self.power_factor_sum += other.power_factor_sum
+        self.energy_wh += other.energy_wh
+        self.covered_seconds += other.covered_seconds
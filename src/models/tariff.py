@@ -0,0 +1,62 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+ALL_WEEKDAYS = (0, 1, 2, 3, 4, 5, 6)  # Monday = 0
+
+
+@dataclass(frozen=True)
+class TariffBand:
+    name: str
+    rate: float  # currency per kWh
+    start: str = "00:00"  # "HH:MM", inclusive
+    # "HH:MM", exclusive. An end earlier than start wraps past midnight; both
+    # parts apply on the listed weekdays.
+    end: str = "24:00"
+    weekdays: Tuple[int, ...] = ALL_WEEKDAYS
+
+
+@dataclass
+class Tariff:
+    """
+    A time-of-use tariff: a default rate plus bands that override it.
+
+    Bands are applied in order, so a later band wins where two overlap,
+    e.g. a weekend band listed after a weekday peak band.
+    """
+
+    name: str
+    default_rate: float
+    bands: List[TariffBand] = field(default_factory=list)
+    default_band: str = "standard"
+
+    @classmethod
+    def flat(cls, name: str, rate: float) -> "Tariff":
+        return cls(name, rate)
+
+    @classmethod
+    def from_dict(cls, record: Dict) -> "Tariff":
+        return cls(
+            name=record["name"],
+            default_rate=float(record["default_rate"]),
+            bands=[
+                TariffBand(
+                    name=band["name"],
+                    rate=float(band["rate"]),
+                    start=band.get("start", "00:00"),
+                    end=band.get("end", "24:00"),
+                    weekdays=tuple(band.get("weekdays", ALL_WEEKDAYS)),
+                )
+                for band in record.get("bands", [])
+            ],
+            default_band=record.get("default_band", "standard"),
+        )
+
+
+@dataclass
+class TariffCost:
+    tariff: str
+    kwh: float
+    cost: float
+    projected_monthly_cost: float
+    band_kwh: Dict[str, float] = field(default_factory=dict)
+    band_cost: Dict[str, float] = field(default_factory=dict)
@@ -0,0 +1,345 @@
+import heapq
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, Optional, Set, Tuple, Union
+from models.device_totals import DeviceTotals
+from models.reading import EnergyReading
+from models.reading_batch import ReadingBatch
+from services import kernels
+from services.analytics import EnergyAnalytics
+from services.rollups import DEFAULT_MAX_GAP_SECONDS
+
+
+@dataclass
+class RunningTotals:
+    """Running sums from which efficiency score and cost are derived in O(1)."""
+    count: int = 0
+    efficiency_sum: float = 0.0
+    power_sum: float = 0.0
+
+    def add(self, efficiency: float, power_watts: float) -> None:
+        """
+        Adds one reading's contribution.
+
+        Args:
+            efficiency: The reading's efficiency metric.
+            power_watts: The reading's real power (V*I*PF).
+        """
+        self.count += 1
+        self.efficiency_sum += efficiency
+        self.power_sum += power_watts
+
+    def remove(self, efficiency: float, power_watts: float) -> None:
+        """
+        Subtracts one reading's contribution.
+
+        Raises:
+            ValueError: If there is no reading left to remove.
+        """
+        if self.count <= 0:
+            raise ValueError("Cannot remove a reading from empty totals")
+        self.count -= 1
+        if not self.count:
+            # Reset exactly instead of carrying floating-point residue.
+            self.count, self.efficiency_sum, self.power_sum = 0, 0.0, 0.0
+            return
+        self.efficiency_sum -= efficiency
+        self.power_sum -= power_watts
+
+    def merge(self, other: "RunningTotals") -> None:
+        """
+        Adds another set of totals, e.g. from another shard, to this one.
+
+        Args:
+            other: The totals to fold in; left unchanged.
+        """
+        self.count += other.count
+        self.efficiency_sum += other.efficiency_sum
+        self.power_sum += other.power_sum
+
+
+class AnalyticsAccumulator:
+    """
+    Incrementally maintained efficiency score, monthly cost and budget status.
+
+    Readings are folded into running totals (overall and per device) as they
+    arrive, so results are O(1) to read no matter how many readings have been
+    seen. Accumulators built on different shards can be merged, and readings
+    can be removed again to implement sliding windows.
+    """
+
+    def __init__(self, base_rate: float = 0.15):
+        self.analytics = EnergyAnalytics(base_rate)
+        self.totals = RunningTotals()
+        self.devices: Dict[str, RunningTotals] = {}
+
+    def _device(self, device_id: str) -> RunningTotals:
+        totals = self.devices.get(device_id)
+        if totals is None:
+            totals = self.devices[device_id] = RunningTotals()
+        return totals
+
+    def _add(self, device_id: str, efficiency: float, power_watts: float) -> None:
+        self.totals.add(efficiency, power_watts)
+        self._device(device_id).add(efficiency, power_watts)
+
+    def _remove(self, device_id: str, efficiency: float, power_watts: float) -> None:
+        totals = self.devices.get(device_id)
+        if totals is None:
+            raise ValueError(f"No readings of device {device_id} to remove")
+        totals.remove(efficiency, power_watts)
+        if not totals.count:
+            del self.devices[device_id]
+        self.totals.remove(efficiency, power_watts)
+
+    def update(self, reading: EnergyReading) -> None:
+        """Adds a single reading."""
+        self._add(
+            reading.device_id,
+            kernels.efficiency(reading.current, reading.power_factor),
+            reading.voltage * reading.current * reading.power_factor,
+        )
+
+    def update_batch(self, readings: Union[ReadingBatch, Iterable[EnergyReading]]) -> None:
+        """Adds every reading of a ReadingBatch or an iterable of readings."""
+        for device_id, efficiency, power_watts in _contributions(readings):
+            self._add(device_id, efficiency, power_watts)
+
+    def remove(self, reading: EnergyReading) -> None:
+        """
+        Removes a reading previously added, e.g. when it leaves a window.
+
+        Raises:
+            ValueError: If no reading of that device is left to remove.
+        """
+        self._remove(
+            reading.device_id,
+            kernels.efficiency(reading.current, reading.power_factor),
+            reading.voltage * reading.current * reading.power_factor,
+        )
+
+    def remove_batch(self, readings: Union[ReadingBatch, Iterable[EnergyReading]]) -> None:
+        """
+        Removes every reading of a ReadingBatch or an iterable of readings.
+
+        Raises:
+            ValueError: If a reading's device has no readings left to remove.
+        """
+        for device_id, efficiency, power_watts in _contributions(readings):
+            self._remove(device_id, efficiency, power_watts)
+
+    def merge(self, other: "AnalyticsAccumulator") -> "AnalyticsAccumulator":
+        """
+        Folds another accumulator (e.g. from another shard) into this one.
+
+        Returns:
+            This accumulator, to allow chaining.
+        """
+        self.totals.merge(other.totals)
+        for device_id, totals in other.devices.items():
+            self._device(device_id).merge(totals)
+        return self
+
+    def _totals_for(self, device_id: Optional[str]) -> RunningTotals:
+        if device_id is None:
+            return self.totals
+        return self.devices.get(device_id) or RunningTotals()
+
+    def efficiency_score(self, device_id: Optional[str] = None) -> float:
+        """Returns the efficiency score overall, or for one device."""
+        totals = self._totals_for(device_id)
+        return totals.efficiency_sum / totals.count if totals.count else 0.0
+
+    def monthly_cost(self, device_id: Optional[str] = None) -> float:
+        """Returns the projected monthly cost overall, or for one device."""
+        totals = self._totals_for(device_id)
+        if not totals.count:
+            return 0.0
+        return self.analytics.monthly_cost_from_totals(totals.power_sum, totals.count)
+
+    def check_budget_exceeded(self, budget: float, device_id: Optional[str] = None) -> Tuple[bool, float]:
+        """Returns (is_exceeded, projected_cost) overall, or for one device."""
+        projected_cost = self.monthly_cost(device_id)
+        return projected_cost > budget, projected_cost
+
+    def result(self, device_id: Optional[str] = None) -> Tuple[float, float]:
+        """Returns (efficiency_score, projected_monthly_cost) in O(1)."""
+        return self.efficiency_score(device_id), self.monthly_cost(device_id)
+
+
+class SlidingWindowAccumulator(AnalyticsAccumulator):
+    """
+    AnalyticsAccumulator restricted to the most recent `window_seconds`.
+
+    Each reading's contribution is remembered in arrival order and removed
+    once it falls out of the window, so memory is bounded by the number of
+    readings inside the window. Readings must arrive in timestamp order.
+    """
+
+    def __init__(self, window_seconds: int, base_rate: float = 0.15):
+        super().__init__(base_rate)
+        self.window_seconds = window_seconds
+        self._window: Deque[Tuple[int, str, float, float]] = deque()
+
+    def update(self, reading: EnergyReading) -> None:
+        """
+        Adds a single reading to the window.
+
+        Readings at or before `window_seconds` before this reading's
+        timestamp are expired right after it is added.
+
+        Args:
+            reading: The newest reading; must not be older than those
+                already in the window.
+        """
+        efficiency = kernels.efficiency(reading.current, reading.power_factor)
+        power_watts = reading.voltage * reading.current * reading.power_factor
+        epoch = reading.epoch_seconds
+        self._window.append((epoch, reading.device_id, efficiency, power_watts))
+        self._add(reading.device_id, efficiency, power_watts)
+        self.expire(epoch - self.window_seconds)
+
+    def update_batch(self, readings: Union[ReadingBatch, Iterable[EnergyReading]]) -> None:
+        """
+        Adds every reading of a ReadingBatch or an iterable of readings.
+
+        A ReadingBatch is added whole and expiry runs once afterwards,
+        against the timestamp of its last row; an iterable expires after
+        each reading, like `update`.
+
+        Args:
+            readings: Readings in timestamp order.
+        """
+        if not isinstance(readings, ReadingBatch):
+            for reading in readings:
+                self.update(reading)
+            return
+        latest = None
+        for epoch, (device_id, efficiency, power_watts) in zip(readings.timestamps, _contributions(readings)):
+            self._window.append((epoch, device_id, efficiency, power_watts))
+            self._add(device_id, efficiency, power_watts)
+            latest = epoch
+        if latest is not None:
+            self.expire(latest - self.window_seconds)
+
+    def expire(self, cutoff_epoch: int) -> int:
+        """
+        Removes readings with timestamps at or before `cutoff_epoch`.
+
+        Returns:
+            The number of readings removed.
+        """
+        removed = 0
+        window = self._window
+        while window and window[0][0] <= cutoff_epoch:
+            _, device_id, efficiency, power_watts = window.popleft()
+            self._remove(device_id, efficiency, power_watts)
+            removed += 1
+        return removed
+
+    def merge(self, other: "AnalyticsAccumulator") -> "AnalyticsAccumulator":
+        """
+        Folds another sliding window (e.g. from another shard) into this one.
+
+        The two windows are interleaved by timestamp and anything older than
+        `window_seconds` before the newest merged reading is expired.
+
+        Returns:
+            This accumulator, to allow chaining.
+
+        Raises:
+            TypeError: If `other` is not a SlidingWindowAccumulator; a plain
+                AnalyticsAccumulator does not remember when its readings
+                arrived, so they could never be expired.
+        """
+        if not isinstance(other, SlidingWindowAccumulator):
+            raise TypeError("A sliding window accumulator can only merge another sliding window accumulator")
+        super().merge(other)
+        self._window = deque(heapq.merge(self._window, other._window, key=lambda entry: entry[0]))
+        if self._window:
+            self.expire(self._window[-1][0] - self.window_seconds)
+        return self
+
+
+class DeviceTotalsAccumulator:
+    """
+    Per-device DeviceTotals maintained incrementally as readings arrive.
+
+    Gives the same sums as `SQLiteReadingStore.device_totals`. Readings
+    passing `kernels.valid_rows` are folded into the count, efficiency,
+    power, peak and power factor sums; the others are only counted in
+    `invalid_readings`, so a device that only sent invalid readings has
+    totals with `readings == 0`. kWh is integrated as RollupEngine does: each
+    reading's power is held until the device's next reading, gaps longer
+    than `max_gap_seconds` are skipped, and a reading older than the
+    device's latest adds no energy. Folding in a batch costs O(rows in the
+    batch), however many readings came before.
+    """
+
+    def __init__(self, max_gap_seconds: int = DEFAULT_MAX_GAP_SECONDS):
+        self.max_gap_seconds = max_gap_seconds
+        self.devices: Dict[str, DeviceTotals] = {}
+        # device_id -> (epoch seconds, watts) of the latest valid reading
+        self._last: Dict[str, Tuple[int, float]] = {}
+
+    def update_batch(self, readings: Union[ReadingBatch, Iterable[EnergyReading]]) -> Set[str]:
+        """
+        Folds every reading of a ReadingBatch or an iterable of readings in.
+
+        Args:
+            readings: Readings of each device should be in time order.
+
+        Returns:
+            The ids of the devices whose totals changed.
+        """
+        if not isinstance(readings, ReadingBatch):
+            readings = ReadingBatch.from_readings(readings)
+        valid = bytearray(len(readings))
+        for i in kernels.valid_rows(readings.voltage, readings.current, readings.power_factor):
+            valid[i] = 1
+        devices, last_seen, max_gap = self.devices, self._last, self.max_gap_seconds
+        device_ids = readings.device_ids
+        efficiency = kernels.efficiency
+        touched = set()
+        for ok, epoch, code, v, c, pf in zip(
+            valid, readings.timestamps, readings.device_codes,
+            readings.voltage, readings.current, readings.power_factor,
+        ):
+            device_id = device_ids[code]
+            touched.add(device_id)
+            t = devices.get(device_id)
+            if t is None:
+                t = devices[device_id] = DeviceTotals(device_id, 0, 0.0, 0.0, 0.0, 0.0, 0.0, epoch, epoch)
+            if not ok:
+                t.invalid_readings += 1
+                continue
+            watts = v * c * pf
+            if not t.readings:
+                t.peak_watts, t.first_timestamp, t.last_timestamp = watts, epoch, epoch
+            else:
+                t.peak_watts = max(t.peak_watts, watts)
+                t.first_timestamp = min(t.first_timestamp, epoch)
+                t.last_timestamp = max(t.last_timestamp, epoch)
+            t.readings += 1
+            t.efficiency_sum += efficiency(c, pf)
+            t.power_sum_watts += watts
+            t.power_factor_sum += pf
+
+            last = last_seen.get(device_id)
+            if last is None or epoch >= last[0]:
+                if last is not None and epoch - last[0] <= max_gap:
+                    t.energy_wh += last[1] * (epoch - last[0]) / 3600.0
+                last_seen[device_id] = (epoch, watts)
+        return touched
+
+
+def _contributions(readings: Union[ReadingBatch, Iterable[EnergyReading]]) -> Iterable[Tuple[str, float, float]]:
+    """Yields (device_id, efficiency, power_watts) for each reading."""
+    efficiency = kernels.efficiency
+    if isinstance(readings, ReadingBatch):
+        device_ids = readings.device_ids
+        for code, v, c, pf in zip(readings.device_codes, readings.voltage, readings.current, readings.power_factor):
+            yield device_ids[code], efficiency(c, pf), v * c * pf
+        return
+    for r in readings:
+        yield r.device_id, efficiency(r.current, r.power_factor), r.voltage * r.current * r.power_factor
@@ -1,48 +1,560 @@
-import math
-from typing import List
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from models.reading import EnergyReading
+from models.reading_batch import ReadingBatch
+from models.anomaly import Anomaly
+from models.device_totals import DeviceTotals
+from models.group_summary import GroupSummary
+from models.reading_index import ReadingIndex
+from models.rollup_bucket import RollupBucket
+from models.tariff import Tariff, TariffCost
+from services import kernels
+from services.device_registry import DeviceRegistry
+from services.anomalies import DEFAULT_THRESHOLD, AnomalyDetector
+from services.rollups import DEFAULT_MAX_GAP_SECONDS
+from services.sketches import DEFAULT_COMPRESSION, DEFAULT_TOP_K, PowerProfile
+from services.tariffs import TariffEngine
+
+Readings = Union[List[EnergyReading], ReadingBatch, ReadingIndex]
+ReadingStream = Iterable[Union[EnergyReading, ReadingBatch]]
+
+# Row-level readings from a stream are buffered into chunks of this size
+# before being handed to the batched kernels.
+STREAM_CHUNK_SIZE = 4096
+
+
+def _columns(readings: Readings) -> Tuple[Sequence[float], Sequence[float], Sequence[float]]:
+    """Returns (voltage, current, power_factor) columns for any supported input type."""
+    if isinstance(readings, ReadingIndex):
+        readings = readings.batch
+    if isinstance(readings, ReadingBatch):
+        return readings.voltage, readings.current, readings.power_factor
+    return (
+        [r.voltage for r in readings],
+        [r.current for r in readings],
+        [r.power_factor for r in readings],
+    )
+
+
+def _iter_column_chunks(stream: ReadingStream) -> Iterator[Tuple[Sequence[float], Sequence[float], Sequence[float]]]:
+    """Yields (voltage, current, power_factor) chunks from a mixed reading stream."""
+    voltages, currents, power_factors = [], [], []
+    for item in stream:
+        if isinstance(item, ReadingBatch):
+            if voltages:
+                yield voltages, currents, power_factors
+                voltages, currents, power_factors = [], [], []
+            yield item.voltage, item.current, item.power_factor
+            continue
+
+        voltages.append(item.voltage)
+        currents.append(item.current)
+        power_factors.append(item.power_factor)
+        if len(voltages) >= STREAM_CHUNK_SIZE:
+            yield voltages, currents, power_factors
+            voltages, currents, power_factors = [], [], []
+    if voltages:
+        yield voltages, currents, power_factors
+
 
 class EnergyAnalytics:
     def __init__(self, base_rate: float = 0.15):
         self.base_rate = base_rate
 
-    def calculate_complex_efficiency_score(self, readings: List[EnergyReading]) -> float:
+    def calculate_complex_efficiency_score(self, readings: Readings) -> float:
         """
-        Calculates a heuristic efficiency score based on power factor variance 
+        Calculates a heuristic efficiency score based on power factor variance
         and harmonic distortion approximation.
         """
         if not readings:
             return 0.0
-            
-        total_score = 0
-        for r in readings:
-            # Complex formula for demonstration purposes
-            # We are simulating a calculation that involves phase angle and hypothetical harmonic loss
-            phase_angle = math.acos(r.power_factor)
-            harmonic_loss_factor = math.sin(phase_angle * 2) ** 2
-            
-            # Weighted efficiency metric
-            efficiency = (r.power_factor * math.exp(-harmonic_loss_factor)) / (1 + math.log1p(r.current))
-            total_score += efficiency
-            
-        return total_score / len(readings)
-
-    def project_monthly_cost(self, readings: List[EnergyReading]) -> float:
+
+        _, currents, power_factors = _columns(readings)
+        # The per-reading formula (phase angle -> hypothetical harmonic loss ->
+        # weighted efficiency) is evaluated over whole columns by kernels.
+        return kernels.efficiency_sum(currents, power_factors) / len(readings)
+
+    def project_monthly_cost(self, readings: Readings) -> float:
         """
         Projects the monthly cost based on the average power consumption
         of the provided readings, assuming 24/7 operation for 30 days.
         """
         if not readings:
             return 0.0
-            
-        total_power_watts = sum(r.voltage * r.current * r.power_factor for r in readings)
-        avg_power_kw = (total_power_watts / len(readings)) / 1000.0
-        
+
+        voltages, currents, power_factors = _columns(readings)
+        total_power_watts = kernels.power_sum(voltages, currents, power_factors)
+        return self.monthly_cost_from_totals(total_power_watts, len(readings))
+
+    def calculate_score_and_cost(self, readings: Readings) -> Tuple[float, float]:
+        """
+        Computes the efficiency score and projected monthly cost together.
+
+        Both metrics are produced by a single batched pass over the reading
+        columns, using NumPy when it is installed.
+
+        Args:
+            readings: A list of EnergyReading objects, a ReadingBatch or a
+                ReadingIndex.
+
+        Returns:
+            A tuple of (efficiency_score, projected_monthly_cost).
+        """
+        if not readings:
+            return 0.0, 0.0
+
+        voltages, currents, power_factors = _columns(readings)
+        eff_total, power_total = kernels.column_sums(voltages, currents, power_factors)
+        return eff_total / len(readings), self.monthly_cost_from_totals(power_total, len(readings))
+
+    def score_and_cost_by_device(
+        self,
+        index: ReadingIndex,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[str, Tuple[float, float]]:
+        """
+        Computes the efficiency score and projected monthly cost per device.
+
+        Each device's rows in [start, end) are located by bisection in the
+        index, so no full scan of the readings is needed.
+
+        Args:
+            index: A ReadingIndex, e.g. from `DataIngestionService.load_index`.
+            start: Inclusive lower time bound, or None for no bound.
+            end: Exclusive upper time bound, or None for no bound.
+
+        Returns:
+            A dict mapping device_id to (efficiency_score, projected_monthly_cost),
+            for devices with at least one reading in the range.
+        """
+        results = {}
+        for device_id in index.device_ids():
+            readings = index.lookup(device_id, start, end)
+            if readings:
+                results[device_id] = self.calculate_score_and_cost(readings)
+        return results
+
+    def group_by(
+        self,
+        readings: Readings,
+        key: str = "device_id",
+        registry: Optional[DeviceRegistry] = None,
+    ) -> List[GroupSummary]:
+        """
+        Computes per-group metrics for every group in a single pass.
+
+        Rows are mapped to dense integer group ids up front (via the batch's
+        device dictionary, joined through the DeviceRegistry for device
+        attributes), then accumulated into flat per-group lists, so no
+        per-row hashing or filtering per group is needed. kWh is integrated
+        over the gaps between consecutive readings of each device, following
+        the same rules as RollupEngine. A group's projected monthly cost is
+        the sum of its devices' projected costs, so a room with two 100 W
+        devices costs twice as much as one with a single 100 W device.
+
+        Args:
+            readings: A list of EnergyReading objects, a ReadingBatch or a
+                ReadingIndex. Readings of each device should be in time order.
+            key: "device_id", or a device attribute such as "location" or
+                "device_type".
+            registry: A DeviceRegistry; required unless key is "device_id".
+
+        Returns:
+            One GroupSummary per group, ordered by group key. Readings of
+            unregistered devices are grouped under the key None.
+
+        Raises:
+            ValueError: If a device attribute key is used without a registry.
+        """
+        if isinstance(readings, ReadingIndex):
+            readings = readings.batch
+        elif not isinstance(readings, ReadingBatch):
+            readings = ReadingBatch.from_readings(readings)
+        if not readings:
+            return []
+
+        if key == "device_id":
+            group_ids, keys = readings.device_codes, readings.device_ids
+        elif registry is None:
+            raise ValueError(f"Grouping by {key!r} requires a DeviceRegistry")
+        else:
+            group_ids, keys = registry.group_codes(readings, key)
+
+        groups = len(keys)
+        counts = [0] * groups
+        eff_sums = [0.0] * groups
+        power_sums = [0.0] * groups
+        energy_wh = [0.0] * groups
+        devices = len(readings.device_ids)
+        device_counts = [0] * devices
+        device_power_sums = [0.0] * devices
+        device_groups = [0] * devices
+        last_seen = {}
+        efficiency = kernels.efficiency
+        max_gap = DEFAULT_MAX_GAP_SECONDS
+
+        for ts, code, group, v, c, pf in zip(
+            readings.timestamps, readings.device_codes, group_ids,
+            readings.voltage, readings.current, readings.power_factor,
+        ):
+            watts = v * c * pf
+            counts[group] += 1
+            eff_sums[group] += efficiency(c, pf)
+            power_sums[group] += watts
+            device_counts[code] += 1
+            device_power_sums[code] += watts
+            device_groups[code] = group
+
+            last = last_seen.get(code)
+            if last is None or ts >= last[0]:
+                if last is not None and ts - last[0] <= max_gap:
+                    energy_wh[group] += last[1] * (ts - last[0]) / 3600.0
+                last_seen[code] = (ts, watts)
+
+        costs = [0.0] * groups
+        for code, count in enumerate(device_counts):
+            if count:
+                costs[device_groups[code]] += self.monthly_cost_from_totals(device_power_sums[code], count)
+
+        summaries = [
+            GroupSummary(
+                key=keys[g],
+                readings=counts[g],
+                efficiency_score=eff_sums[g] / counts[g],
+                avg_power_watts=power_sums[g] / counts[g],
+                kwh=energy_wh[g] / 1000.0,
+                projected_monthly_cost=costs[g],
+            )
+            for g in range(groups)
+            if counts[g]
+        ]
+        return sorted(summaries, key=lambda s: (s.key is None, str(s.key)))
+
+    def group_totals(
+        self,
+        totals: Iterable[DeviceTotals],
+        key: str = "device_id",
+        registry: Optional[DeviceRegistry] = None,
+    ) -> List[GroupSummary]:
+        """
+        Folds pre-aggregated per-device totals into per-group summaries.
+
+        Gives the same result as `group_by` over the underlying readings, for
+        callers that already hold per-device sums (e.g. from
+        `SQLiteReadingStore.device_totals`).
+
+        Raises:
+            ValueError: If a device attribute key is used without a registry.
+        """
+        if key != "device_id" and registry is None:
+            raise ValueError(f"Grouping by {key!r} requires a DeviceRegistry")
+        groups: Dict = {}
+        for t in totals:
+            if key == "device_id":
+                group = t.device_id
+            else:
+                device = registry.get(t.device_id)
+                group = getattr(device, key) if device is not None else None
+            if not t.readings:
+                continue
+            acc = groups.setdefault(group, [0, 0.0, 0.0, 0.0, 0.0])
+            acc[0] += t.readings
+            acc[1] += t.efficiency_sum
+            acc[2] += t.power_sum_watts
+            acc[3] += t.energy_wh
+            acc[4] += self.monthly_cost_from_totals(t.power_sum_watts, t.readings)
+        summaries = [
+            GroupSummary(
+                key=group,
+                readings=count,
+                efficiency_score=eff_sum / count,
+                avg_power_watts=power_sum / count,
+                kwh=energy_wh / 1000.0,
+                projected_monthly_cost=cost,
+            )
+            for group, (count, eff_sum, power_sum, energy_wh, cost) in groups.items()
+        ]
+        return sorted(summaries, key=lambda s: (s.key is None, str(s.key)))
+
+    def monthly_cost_from_totals(self, total_power_watts: float, count: int) -> float:
+        """
+        Projects the monthly cost from pre-aggregated totals.
+
+        Args:
+            total_power_watts: Sum of V*I*PF over `count` readings.
+            count: Number of readings in the sum; must be positive.
+
+        Returns:
+            The projected monthly cost, assuming 24/7 operation for 30 days.
+        """
+        avg_power_kw = (total_power_watts / count) / 1000.0
+
         # 30 days * 24 hours = 720 hours
         monthly_energy_kwh = avg_power_kw * 720
         return monthly_energy_kwh * self.base_rate
 
-    def check_budget_exceeded(self, readings: List[EnergyReading], budget: float) -> tuple[bool, float]:
+    def project_monthly_cost_from_rollups(self, buckets: Iterable[RollupBucket]) -> float:
+        """
+        Projects the monthly cost from pre-aggregated rollup buckets.
+
+        Unlike `project_monthly_cost`, this uses energy integrated over the
+        actual reading timestamps: each device's measured kWh is scaled from
+        the time it was observed to a 30-day month, and devices are summed.
+
+        Args:
+            buckets: Rollup buckets of any window size, e.g. from
+                `RollupEngine.rollup("day")`.
+
+        Returns:
+            The projected monthly cost for all devices in the buckets. Devices
+            with readings but no observed interval are costed at their
+            average reading power.
+        """
+        energy_kwh: Dict[str, float] = {}
+        covered_hours: Dict[str, float] = {}
+        power_sums: Dict[str, float] = {}
+        counts: Dict[str, int] = {}
+        for b in buckets:
+            energy_kwh[b.device_id] = energy_kwh.get(b.device_id, 0.0) + b.kwh
+            covered_hours[b.device_id] = covered_hours.get(b.device_id, 0.0) + b.covered_seconds / 3600.0
+            power_sums[b.device_id] = power_sums.get(b.device_id, 0.0) + b.power_sum_watts
+            counts[b.device_id] = counts.get(b.device_id, 0) + b.readings
+
+        monthly_energy_kwh = 0.0
+        for device_id, hours in covered_hours.items():
+            if hours:
+                monthly_energy_kwh += energy_kwh[device_id] / hours * 720
+            elif counts[device_id]:
+                # No interval was observed (e.g. a single reading); fall back
+                # to the average reading power, as `project_monthly_cost` does.
+                monthly_energy_kwh += power_sums[device_id] / counts[device_id] / 1000.0 * 720
+        return monthly_energy_kwh * self.base_rate
+
+    def check_budget_exceeded_from_rollups(self, buckets: Iterable[RollupBucket], budget: float) -> tuple[bool, float]:
+        """
+        Rollup-based variant of `check_budget_exceeded`.
+        Returns a tuple of (is_exceeded, projected_cost).
+        """
+        projected_cost = self.project_monthly_cost_from_rollups(buckets)
+        return projected_cost > budget, projected_cost
+
+    def compare_tariffs(self, readings: Readings, tariffs: Iterable[Tariff]) -> Dict[str, TariffCost]:
+        """
+        Prices the same readings under several time-of-use tariffs.
+
+        All tariffs are evaluated in one pass over the readings; see
+        TariffEngine. Use `Tariff.flat("flat", self.base_rate)` to include
+        the flat rate in the comparison.
+
+        Args:
+            readings: A list of EnergyReading objects, a ReadingBatch or a
+                ReadingIndex.
+            tariffs: The tariffs to compare; names must be unique.
+
+        Returns:
+            A dict mapping tariff name to its TariffCost.
+        """
+        if isinstance(readings, ReadingIndex):
+            readings = readings.batch
+        engine = TariffEngine(tariffs)
+        engine.update(readings)
+        return engine.costs()
+
+    def stream_compare_tariffs(self, stream: ReadingStream, tariffs: Iterable[Tariff]) -> Dict[str, TariffCost]:
+        """
+        Streaming variant of `compare_tariffs`.
+
+        Args:
+            stream: Any iterable of EnergyReading objects and/or ReadingBatch
+                chunks. It is consumed exactly once.
+        """
+        engine = TariffEngine(tariffs)
+        rows: List[EnergyReading] = []
+        for item in stream:
+            if isinstance(item, ReadingBatch):
+                if rows:
+                    engine.update(rows)
+                    rows = []
+                engine.update(item)
+                continue
+            rows.append(item)
+            if len(rows) >= STREAM_CHUNK_SIZE:
+                engine.update(rows)
+                rows = []
+        if rows:
+            engine.update(rows)
+        return engine.costs()
+
+    def power_profile(
+        self,
+        readings: Readings,
+        compression: float = DEFAULT_COMPRESSION,
+        top_k: int = DEFAULT_TOP_K,
+    ) -> PowerProfile:
+        """
+        Builds per-device power quantile sketches and peak demand heaps.
+
+        Args:
+            readings: A list of EnergyReading objects, a ReadingBatch or a
+                ReadingIndex.
+            compression: t-digest compression; higher is more accurate.
+            top_k: Number of peak demand intervals kept overall and per device.
+
+        Returns:
+            A PowerProfile; query it with `quantiles(device_id)` (p50/p95/p99
+            by default) and `peak_demand()`, or merge it with profiles built
+            on other files.
+        """
+        if isinstance(readings, ReadingIndex):
+            readings = readings.batch
+        profile = PowerProfile(compression, top_k)
+        profile.update(readings)
+        return profile
+
+    def stream_power_profile(
+        self,
+        stream: ReadingStream,
+        compression: float = DEFAULT_COMPRESSION,
+        top_k: int = DEFAULT_TOP_K,
+    ) -> PowerProfile:
+        """
+        Streaming variant of `power_profile`; memory stays bounded per device.
+
+        Args:
+            stream: Any iterable of EnergyReading objects and/or ReadingBatch
+                chunks. It is consumed exactly once.
+        """
+        profile = PowerProfile(compression, top_k)
+        for item in stream:
+            if isinstance(item, ReadingBatch):
+                profile.update(item)
+            else:
+                profile.add(
+                    item.epoch_seconds, item.device_id, item.voltage * item.current * item.power_factor
+                )
+        return profile
+
+    def detect_anomalies(
+        self,
+        readings: Readings,
+        threshold: float = DEFAULT_THRESHOLD,
+        method: str = "welford",
+    ) -> List[Anomaly]:
+        """
+        Flags power spikes and invalid readings per device.
+
+        Args:
+            readings: A list of EnergyReading objects, a ReadingBatch or a
+                ReadingIndex. Readings of each device should be in time order.
+            threshold: |z| above which a reading is flagged as a spike.
+            method: "welford" (running mean/stddev) or "ewma"; see
+                AnomalyDetector.
+
+        Returns:
+            The flagged readings as Anomaly objects, in input order.
+        """
+        if isinstance(readings, ReadingIndex):
+            readings = readings.batch
+        return AnomalyDetector(threshold, method).detect(readings)
+
+    def stream_detect_anomalies(
+        self,
+        stream: ReadingStream,
+        threshold: float = DEFAULT_THRESHOLD,
+        method: str = "welford",
+    ) -> Iterator[Anomaly]:
+        """
+        Streaming variant of `detect_anomalies`.
+
+        Anomalies are yielded as each chunk of the stream is scored; memory
+        stays constant per device.
+
+        Args:
+            stream: Any iterable of EnergyReading objects and/or ReadingBatch
+                chunks. It is consumed exactly once.
+        """
+        detector = AnomalyDetector(threshold, method)
+        rows: List[EnergyReading] = []
+        for item in stream:
+            if isinstance(item, ReadingBatch):
+                if rows:
+                    yield from detector.detect(rows)
+                    rows = []
+                yield from detector.detect(item)
+                continue
+            rows.append(item)
+            if len(rows) >= STREAM_CHUNK_SIZE:
+                yield from detector.detect(rows)
+                rows = []
+        if rows:
+            yield from detector.detect(rows)
+
+    def stream_efficiency_score(self, stream: ReadingStream) -> float:
+        """
+        Streaming variant of `calculate_complex_efficiency_score`.
+
+        Args:
+            stream: Any iterable of EnergyReading objects and/or ReadingBatch
+                chunks, e.g. `DataIngestionService.iter_batches(...)`. It is
+                consumed exactly once.
+
+        Returns:
+            The average efficiency score, or 0.0 for an empty stream.
+        """
+        total, count = 0.0, 0
+        for _, currents, power_factors in _iter_column_chunks(stream):
+            total += kernels.efficiency_sum(currents, power_factors)
+            count += len(power_factors)
+        return total / count if count else 0.0
+
+    def stream_monthly_cost(self, stream: ReadingStream) -> float:
+        """
+        Streaming variant of `project_monthly_cost`.
+
+        Args:
+            stream: Any iterable of EnergyReading objects and/or ReadingBatch
+                chunks. It is consumed exactly once.
+
+        Returns:
+            The projected monthly cost, or 0.0 for an empty stream.
+        """
+        total, count = 0.0, 0
+        for voltages, currents, power_factors in _iter_column_chunks(stream):
+            total += kernels.power_sum(voltages, currents, power_factors)
+            count += len(power_factors)
+        return self.monthly_cost_from_totals(total, count) if count else 0.0
+
+    def stream_score_and_cost(self, stream: ReadingStream) -> Tuple[float, float]:
+        """
+        Streaming variant of `calculate_score_and_cost`.
+
+        Args:
+            stream: Any iterable of EnergyReading objects and/or ReadingBatch
+                chunks. It is consumed exactly once.
+
+        Returns:
+            A tuple of (efficiency_score, projected_monthly_cost).
+        """
+        eff_total, power_total, count = 0.0, 0.0, 0
+        for voltages, currents, power_factors in _iter_column_chunks(stream):
+            eff_sum, power_sum = kernels.column_sums(voltages, currents, power_factors)
+            eff_total += eff_sum
+            power_total += power_sum
+            count += len(power_factors)
+        if not count:
+            return 0.0, 0.0
+        return eff_total / count, self.monthly_cost_from_totals(power_total, count)
+
+    def stream_check_budget_exceeded(self, stream: ReadingStream, budget: float) -> tuple[bool, float]:
+        """
+        Streaming variant of `check_budget_exceeded`.
+        Returns a tuple of (is_exceeded, projected_cost).
+        """
+        projected_cost = self.stream_monthly_cost(stream)
+        return projected_cost > budget, projected_cost
+
+    def check_budget_exceeded(self, readings: Readings, budget: float) -> tuple[bool, float]:
         """
         Checks if the projected monthly cost exceeds the given budget.
         Returns a tuple of (is_exceeded, projected_cost).
@@ -0,0 +1,204 @@
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Union
+from models.anomaly import Anomaly
+from models.reading import EnergyReading
+from models.reading_batch import ReadingBatch
+from services import kernels
+
+np = kernels.np
+
+METHODS = ("welford", "ewma")
+DEFAULT_THRESHOLD = 3.0
+# Readings a device must have seen before any of its readings are flagged.
+DEFAULT_WARMUP = 30
+DEFAULT_ALPHA = 0.05
+
+
+class AnomalyDetector:
+    """
+    Flags power spikes and invalid sensor values per device in one pass.
+
+    Each reading's real power is scored against its device's statistics
+    from before that reading: the running mean and population standard
+    deviation (Welford) or their exponentially weighted counterparts (EWMA,
+    which adapts to level shifts). Readings with |z| above the threshold are
+    flagged as spikes. Readings with non-finite values, negative voltage or
+    current, or a power factor outside [-1, 1] are flagged as invalid and
+    kept out of the statistics. State is three numbers per device.
+
+    The Welford method is vectorized with NumPy when it is installed; EWMA
+    is inherently sequential and always runs as a Python loop.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        method: str = "welford",
+        alpha: float = DEFAULT_ALPHA,
+        warmup: int = DEFAULT_WARMUP,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Unknown anomaly detection method: {method}")
+        self.threshold = threshold
+        self.method = method
+        self.alpha = alpha
+        self.warmup = warmup
+
+        self._device_ids: List[str] = []
+        self._device_lookup: Dict[str, int] = {}
+        # Per device code: readings seen, mean, and M2 (Welford) or variance (EWMA).
+        self._count = array('d')
+        self._mean = array('d')
+        self._spread = array('d')
+
+    def _encode(self, device_id: str) -> int:
+        code = self._device_lookup.get(device_id)
+        if code is None:
+            code = self._device_lookup[device_id] = len(self._device_ids)
+            self._device_ids.append(device_id)
+            self._count.append(0.0)
+            self._mean.append(0.0)
+            self._spread.append(0.0)
+        return code
+
+    def stats(self, device_id: str) -> Optional[tuple]:
+        """Returns (count, mean, stddev) of a device's power, or None if unseen."""
+        code = self._device_lookup.get(device_id)
+        if code is None:
+            return None
+        count, mean, spread = self._count[code], self._mean[code], self._spread[code]
+        variance = spread / count if self.method == "welford" and count else spread
+        return int(count), mean, math.sqrt(max(variance, 0.0))
+
+    def detect(
+        self,
+        readings: Union[ReadingBatch, Iterable[EnergyReading]],
+        backend: Optional[str] = None,
+    ) -> List[Anomaly]:
+        """
+        Scores a ReadingBatch or iterable of readings and folds it into the
+        per-device statistics.
+
+        Readings of a device should arrive in timestamp order.
+
+        Returns:
+            The flagged readings, in input order.
+        """
+        if not isinstance(readings, ReadingBatch):
+            readings = ReadingBatch.from_readings(readings)
+        if not readings:
+            return []
+        code_map = [self._encode(device_id) for device_id in readings.device_ids]
+        backend = backend or kernels.default_backend(len(readings))
+        if backend not in kernels.BACKENDS:
+            raise ValueError(f"Unknown kernel backend: {backend}")
+        if backend == "numpy" and self.method == "welford":
+            return self._detect_welford_numpy(readings, code_map)
+        return self._detect_python(readings, code_map)
+
+    def _detect_python(self, batch: ReadingBatch, code_map: List[int]) -> List[Anomaly]:
+        count, mean, spread = self._count, self._mean, self._spread
+        threshold, warmup, alpha = self.threshold, self.warmup, self.alpha
+        welford = self.method == "welford"
+        isfinite, sqrt = math.isfinite, math.sqrt
+        device_ids = self._device_ids
+        anomalies = []
+        for ts, code, v, c, pf in zip(
+            batch.timestamps, batch.device_codes, batch.voltage, batch.current, batch.power_factor
+        ):
+            device = code_map[code]
+            x = v * c * pf
+            if not (isfinite(x) and v >= 0.0 and c >= 0.0 and -1.0 <= pf <= 1.0):
+                anomalies.append(Anomaly(device_ids[device], ts, x, "invalid"))
+                continue
+
+            n, mu, s = count[device], mean[device], spread[device]
+            if n >= warmup and n:
+                variance = s / n if welford else s
+                if variance > 0.0:
+                    z = (x - mu) / sqrt(variance)
+                    if abs(z) > threshold:
+                        anomalies.append(Anomaly(device_ids[device], ts, x, "spike", z))
+
+            delta = x - mu
+            if welford:
+                mu += delta / (n + 1)
+                s += delta * (x - mu)
+            elif n:
+                increment = alpha * delta
+                mu += increment
+                s = (1.0 - alpha) * (s + delta * increment)
+            else:
+                mu = x
+            count[device], mean[device], spread[device] = n + 1, mu, s
+        return anomalies
+
+    def _detect_welford_numpy(self, batch: ReadingBatch, code_map: List[int]) -> List[Anomaly]:
+        ts = np.asarray(batch.timestamps, dtype=np.int64)
+        device = np.asarray(code_map, dtype=np.int64)[np.asarray(batch.device_codes, dtype=np.int64)]
+        v, c, pf = kernels._as_float_arrays(batch.voltage, batch.current, batch.power_factor)
+        x = v * c * pf
+        valid = np.isfinite(x) & (v >= 0.0) & (c >= 0.0) & (pf >= -1.0) & (pf <= 1.0)
+
+        # Group valid rows by device, keeping input (time) order within each.
+        rows = np.flatnonzero(valid)
+        rows = rows[np.argsort(device[rows], kind="stable")]
+        d = device[rows]
+        xs = x[rows]
+        count = np.frombuffer(self._count, dtype=np.float64)
+        mean = np.frombuffer(self._mean, dtype=np.float64)
+        m2 = np.frombuffer(self._spread, dtype=np.float64)
+
+        flagged_rows = np.empty(0, dtype=np.int64)
+        z = np.empty(0)
+        if rows.size:
+            new_segment = np.empty(d.size, dtype=bool)
+            new_segment[0] = True
+            np.not_equal(d[1:], d[:-1], out=new_segment[1:])
+            starts = np.flatnonzero(new_segment)
+            ends = np.append(starts[1:], d.size) - 1
+            segment = np.cumsum(new_segment) - 1
+            position = np.arange(d.size) - starts[segment]
+
+            # Running sums are taken relative to each device's prior mean (or
+            # first value) so that M2 keeps full precision, as in Welford.
+            seg_devices = d[starts]
+            n0 = count[seg_devices]
+            shift = np.where(n0 > 0, mean[seg_devices], xs[starts])
+            y = xs - shift[segment]
+            total = np.cumsum(y)
+            total_sq = np.cumsum(y * y)
+            before = total - y
+            before_sq = total_sq - y * y
+            base, base_sq = before[starts], before_sq[starts]
+            n = n0[segment] + position
+            s = before - base[segment]
+            q = before_sq - base_sq[segment] + m2[seg_devices][segment]
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mu = s / n
+                variance = (q - s * mu) / n
+                z = (y - mu) / np.sqrt(np.maximum(variance, 0.0))
+            flagged = (n >= self.warmup) & (n > 0) & (variance > 0.0) & (np.abs(z) > self.threshold)
+            flagged_rows, z = rows[flagged], z[flagged]
+
+            n_end = n0 + (ends - starts + 1)
+            s_end = total[ends] - base
+            q_end = total_sq[ends] - base_sq + m2[seg_devices]
+            count[seg_devices] = n_end
+            mean[seg_devices] = shift + s_end / n_end
+            m2[seg_devices] = q_end - s_end * s_end / n_end
+        del count, mean, m2
+
+        device_ids = self._device_ids
+        anomalies = [
+            (row, Anomaly(device_ids[int(device[row])], int(ts[row]), float(x[row]), "spike", float(score)))
+            for row, score in zip(flagged_rows.tolist(), z.tolist())
+        ]
+        anomalies.extend(
+            (row, Anomaly(device_ids[int(device[row])], int(ts[row]), float(x[row]), "invalid"))
+            for row in np.flatnonzero(~valid).tolist()
+        )
+        anomalies.sort(key=lambda item: item[0])
+        return [anomaly for _, anomaly in anomalies]
@@ -0,0 +1,149 @@
+"""
+Compact binary format for energy readings.
+
+Layout (all integers little-endian):
+
+    header      32 bytes: magic b"EREADBIN", uint32 version, uint32 device
+                count, uint64 row count, uint64 device dictionary size
+    dictionary  UTF-8 JSON array of device ids, zero-padded to 8 bytes
+    timestamps  int64[rows]    epoch seconds
+    voltage     float64[rows]
+    current     float64[rows]
+    pf          float64[rows]
+    codes       int32[rows]    index into the device dictionary
+
+Usage:
+    cd src && python -m services.binary_store data/readings.csv data/readings.bin
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Sequence
+
+from models.reading_batch import ReadingBatch
+
+MAGIC = b"EREADBIN"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+
+_COLUMNS = (
+    ("timestamps", "q"),
+    ("voltage", "d"),
+    ("current", "d"),
+    ("power_factor", "d"),
+    ("device_codes", "i"),
+)
+_ROW_SIZE = sum(struct.calcsize(typecode) for _, typecode in _COLUMNS)
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _padded(length: int) -> int:
+    return (length + 7) & ~7
+
+
+def column_bytes(column: Sequence, typecode: str) -> bytes:
+    """Returns a column's values as little-endian bytes of the given array typecode."""
+    if _LITTLE_ENDIAN and isinstance(column, array) and column.typecode == typecode:
+        return column.tobytes()
+    col = array(typecode, column)
+    if not _LITTLE_ENDIAN:
+        col.byteswap()
+    return col.tobytes()
+
+
+def write_binary(batch: ReadingBatch, path: str) -> None:
+    """
+    Writes a ReadingBatch to `path` in the binary readings format.
+
+    Args:
+        batch: The readings to write.
+        path: Destination file path; overwritten if it exists.
+    """
+    dictionary = json.dumps(batch.device_ids).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(batch.device_ids), len(batch), len(dictionary)))
+        f.write(dictionary.ljust(_padded(len(dictionary)), b"\0"))
+        for name, typecode in _COLUMNS:
+            f.write(column_bytes(getattr(batch, name), typecode))
+
+
+def open_binary(path: str) -> ReadingBatch:
+    """
+    Opens a binary readings file as a read-only, memory-mapped ReadingBatch.
+
+    On little-endian hosts the columns are zero-copy memoryviews over the
+    mapping, so only the pages that are actually touched get read from disk.
+
+    Args:
+        path: Path to a file produced by `write_binary`.
+
+    Returns:
+        A ReadingBatch whose columns must not be appended to.
+
+    Raises:
+        ValueError: If the file is not a supported binary readings file.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ValueError(f"{path} is not a binary readings file")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        magic, version, device_count, rows, dict_size = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary readings file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported binary readings version {version} in {path}")
+
+        offset = HEADER.size
+        device_ids = json.loads(bytes(mapped[offset:offset + dict_size]).decode("utf-8"))
+        if len(device_ids) != device_count:
+            raise ValueError(f"Corrupt device dictionary in {path}")
+        offset += _padded(dict_size)
+
+        if offset + rows * _ROW_SIZE > len(mapped):
+            raise ValueError(f"Truncated binary readings file: {path}")
+    except Exception:
+        mapped.close()
+        raise
+
+    view = memoryview(mapped)
+    columns = {}
+    for name, typecode in _COLUMNS:
+        size = rows * struct.calcsize(typecode)
+        raw = view[offset:offset + size]
+        if _LITTLE_ENDIAN:
+            columns[name] = raw.cast(typecode)
+        else:
+            col = array(typecode, bytes(raw))
+            col.byteswap()
+            columns[name] = col
+        offset += size
+
+    return ReadingBatch(device_ids=device_ids, **columns)
+
+
+def convert_csv_to_binary(csv_path: str, bin_path: str) -> int:
+    """
+    Converts a readings CSV into the binary format.
+
+    Returns:
+        The number of readings written.
+    """
+    from services.data_ingestion import DataIngestionService
+
+    batch = DataIngestionService().load_batch(csv_path)
+    write_binary(batch, bin_path)
+    return len(batch)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__, file=sys.stderr)
+        sys.exit(2)
+    count = convert_csv_to_binary(sys.argv[1], sys.argv[2])
+    print(f"Wrote {count} readings to {sys.argv[2]}")
@@ -0,0 +1,351 @@
+"""
+Columnar file formats for readings and rollups, with projection and pushdown.
+
+Two formats share one API, chosen by file extension:
+
+* `.parquet` - Apache Parquet via the optional `pyarrow` package, for
+  downstream tools that read Parquet natively.
+* anything else - a stdlib-only format: zlib-compressed column chunks in
+  row groups, with a JSON footer holding each group's device, row count,
+  time range and chunk offsets. Layout:
+
+      header      12 bytes: magic b"ERCOLUMN", uint32 version
+      chunks      zlib-compressed little-endian column chunks
+      footer      zlib-compressed UTF-8 JSON metadata
+      trailer     16 bytes: uint64 footer size, magic b"ERCOLUMN"
+
+Rows are written sorted by (device, time) and each row group holds a single
+device, so a device/time-range query only reads (and decompresses) the
+column chunks of overlapping row groups, and only for the requested columns.
+Timestamps are delta-encoded within a group before compression.
+"""
+
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from models.reading_batch import ReadingBatch
+from models.rollup_bucket import RollupBucket
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; the built-in columnar format is always available.
+    pa = pq = None
+
+MAGIC = b"ERCOLUMN"
+VERSION = 1
+HEADER = struct.Struct("<8sI")
+TRAILER = struct.Struct("<Q8s")
+DEFAULT_ROW_GROUP_SIZE = 65536
+
+# (name, array typecode); the first column is the time column used for pushdown.
+READING_COLUMNS = (("timestamps", "q"), ("voltage", "d"), ("current", "d"), ("power_factor", "d"))
+ROLLUP_COLUMNS = (
+    ("start", "q"),
+    ("readings", "q"),
+    ("power_sum_watts", "d"),
+    ("peak_watts", "d"),
+    ("power_factor_sum", "d"),
+    ("energy_wh", "d"),
+    ("covered_seconds", "d"),
+)
+_ARROW_TYPES = {"q": "int64", "d": "float64"}
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+ColumnSpec = Sequence[Tuple[str, str]]
+# (device dictionary, per-row device codes, requested columns by name)
+Table = Tuple[List[str], array, Dict[str, array]]
+
+
+def is_parquet(path: str) -> bool:
+    """Returns True if `path` names a Parquet file (by its .parquet extension)."""
+    return path.lower().endswith(".parquet")
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Reading or writing .parquet files requires pyarrow to be installed")
+
+
+def _encode(values: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return zlib.compress(values.tobytes())
+
+
+def _decode(data: bytes, typecode: str) -> array:
+    values = array(typecode)
+    values.frombytes(zlib.decompress(data))
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _sorted_rows(codes: Sequence[int], times: Sequence[int]) -> List[int]:
+    return sorted(range(len(times)), key=lambda i: (codes[i], times[i]))
+
+
+def write_table(
+    path: str,
+    kind: str,
+    spec: ColumnSpec,
+    device_ids: List[str],
+    codes: Sequence[int],
+    columns: Dict[str, Sequence],
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> None:
+    """
+    Writes a device-keyed table, sorted by (device, time), in either format.
+
+    Args:
+        path: Destination path; `.parquet` selects Parquet.
+        kind: Table kind recorded in the file, e.g. "readings".
+        spec: Column names and typecodes; the first is the time column.
+        device_ids: Device dictionary that `codes` index into.
+        codes: Per-row device codes.
+        columns: Column values by name, one entry per name in `spec`.
+        row_group_size: Maximum rows per row group.
+
+    Raises:
+        ValueError: If row_group_size is not positive.
+    """
+    if row_group_size <= 0:
+        raise ValueError("row_group_size must be positive")
+    order = _sorted_rows(codes, columns[spec[0][0]])
+    if is_parquet(path):
+        _write_parquet(path, kind, spec, device_ids, codes, columns, order, row_group_size)
+        return
+
+    time_name = spec[0][0]
+    groups = []
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION))
+        offset = HEADER.size
+        first = 0
+        while first < len(order):
+            code = codes[order[first]]
+            stop = first + 1
+            while stop < len(order) and stop - first < row_group_size and codes[order[stop]] == code:
+                stop += 1
+            rows = order[first:stop]
+            group = {"device": code, "rows": len(rows), "chunks": {}}
+            for name, typecode in spec:
+                values = array(typecode, [columns[name][i] for i in rows])
+                if name == time_name:
+                    group["min_time"], group["max_time"] = values[0], values[-1]
+                    values = array(typecode, [values[0]] + [b - a for a, b in zip(values, values[1:])])
+                data = _encode(values)
+                f.write(data)
+                group["chunks"][name] = [offset, len(data)]
+                offset += len(data)
+            groups.append(group)
+            first = stop
+
+        footer = zlib.compress(json.dumps({
+            "kind": kind,
+            "columns": [list(column) for column in spec],
+            "device_ids": device_ids,
+            "row_groups": groups,
+        }).encode("utf-8"))
+        f.write(footer)
+        f.write(TRAILER.pack(len(footer), MAGIC))
+
+
+def _write_parquet(path, kind, spec, device_ids, codes, columns, order, row_group_size) -> None:
+    _require_pyarrow()
+    arrays = [pa.array([device_ids[codes[i]] for i in order], type=pa.string())]
+    names = ["device_id"]
+    for name, typecode in spec:
+        values = columns[name]
+        arrays.append(pa.array([values[i] for i in order], type=_ARROW_TYPES[typecode]))
+        names.append(name)
+    table = pa.Table.from_arrays(arrays, names=names).replace_schema_metadata({"kind": kind})
+    pq.write_table(table, path, row_group_size=row_group_size, compression="zstd")
+
+
+def read_table(
+    path: str,
+    kind: str,
+    spec: ColumnSpec,
+    columns: Optional[Iterable[str]] = None,
+    device_id: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> Table:
+    """
+    Reads selected columns of the rows matching a device and time range.
+
+    Row groups whose device or time range cannot match are skipped without
+    reading their bytes, and only the requested columns are decompressed.
+
+    Args:
+        path: A file written by `write_table`.
+        kind: Expected table kind.
+        spec: Expected column spec.
+        columns: Column names to load; all columns when omitted.
+        device_id: Only return rows for this device.
+        start: Only return rows at or after this epoch second.
+        end: Only return rows before this epoch second.
+
+    Returns:
+        A tuple of (device dictionary, per-row device codes, columns by name).
+
+    Raises:
+        ValueError: If the file is not a columnar file of this kind, or an
+            unknown column is requested.
+    """
+    typecodes = dict(spec)
+    wanted = list(columns) if columns is not None else [name for name, _ in spec]
+    unknown = [name for name in wanted if name not in typecodes]
+    if unknown:
+        raise ValueError(f"Unknown {kind} column(s): {', '.join(unknown)}")
+    if is_parquet(path):
+        return _read_parquet(path, kind, spec, wanted, device_id, start, end)
+
+    time_name = spec[0][0]
+    with open(path, "rb") as f:
+        magic, version = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a columnar readings file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported columnar file version {version} in {path}")
+        f.seek(-TRAILER.size, 2)
+        footer_size, magic = TRAILER.unpack(f.read(TRAILER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Truncated columnar file: {path}")
+        f.seek(-(TRAILER.size + footer_size), 2)
+        footer = json.loads(zlib.decompress(f.read(footer_size)))
+        if footer["kind"] != kind or [tuple(c) for c in footer["columns"]] != list(spec):
+            raise ValueError(f"{path} does not hold {kind}")
+
+        device_ids: List[str] = footer["device_ids"]
+        code = None
+        if device_id is not None:
+            if device_id not in device_ids:
+                return device_ids, array('i'), {name: array(typecodes[name]) for name in wanted}
+            code = device_ids.index(device_id)
+
+        def chunk(group: dict, name: str) -> array:
+            offset, size = group["chunks"][name]
+            f.seek(offset)
+            return _decode(f.read(size), typecodes[name])
+
+        out_codes = array('i')
+        out = {name: array(typecodes[name]) for name in wanted}
+        for group in footer["row_groups"]:
+            if code is not None and group["device"] != code:
+                continue
+            if (start is not None and group["max_time"] < start) or (end is not None and group["min_time"] >= end):
+                continue
+            lo, hi = 0, group["rows"]
+            times = None
+            clipped = (start is not None and group["min_time"] < start) or (end is not None and group["max_time"] >= end)
+            if clipped or time_name in out:
+                times = array('q', accumulate(chunk(group, time_name)))
+                if start is not None:
+                    lo = bisect_left(times, start)
+                if end is not None:
+                    hi = bisect_left(times, end)
+            if hi <= lo:
+                continue
+            out_codes.extend(array('i', [group["device"]]) * (hi - lo))
+            for name in wanted:
+                values = times if name == time_name else chunk(group, name)
+                out[name].extend(values[lo:hi])
+    return device_ids, out_codes, out
+
+
+def _read_parquet(path, kind, spec, wanted, device_id, start, end) -> Table:
+    _require_pyarrow()
+    time_name = spec[0][0]
+    metadata = pq.read_schema(path).metadata or {}
+    if metadata.get(b"kind") != kind.encode():
+        raise ValueError(f"{path} does not hold {kind}")
+    filters = []
+    if device_id is not None:
+        filters.append(("device_id", "=", device_id))
+    if start is not None:
+        filters.append((time_name, ">=", start))
+    if end is not None:
+        filters.append((time_name, "<", end))
+    table = pq.read_table(path, columns=["device_id"] + wanted, filters=filters or None)
+
+    encoded = table.column("device_id").combine_chunks().dictionary_encode()
+    codes = _from_arrow(encoded.indices.cast(pa.int32()), "i")
+    typecodes = dict(spec)
+    columns = {name: _from_arrow(table.column(name).combine_chunks(), typecodes[name]) for name in wanted}
+    return encoded.dictionary.to_pylist(), codes, columns
+
+
+def _from_arrow(values, typecode: str) -> array:
+    """Copies a null-free primitive Arrow array into a stdlib array."""
+    out = array(typecode)
+    if len(values):
+        width = out.itemsize
+        data = values.buffers()[1]
+        out.frombytes(memoryview(data)[values.offset * width:(values.offset + len(values)) * width])
+    return out
+
+
+def write_readings(batch: ReadingBatch, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> None:
+    """Writes a ReadingBatch as a columnar readings file."""
+    write_table(
+        path, "readings", READING_COLUMNS, batch.device_ids, batch.device_codes,
+        {name: getattr(batch, name) for name, _ in READING_COLUMNS}, row_group_size,
+    )
+
+
+def read_readings(
+    path: str,
+    device_id: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> ReadingBatch:
+    """Loads the readings matching a device and [start, end) epoch range as a ReadingBatch."""
+    device_ids, codes, columns = read_table(path, "readings", READING_COLUMNS, None, device_id, start, end)
+    return ReadingBatch(device_codes=codes, device_ids=list(device_ids), **columns)
+
+
+def write_rollups(buckets: Iterable[RollupBucket], path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> None:
+    """Writes rollup buckets (of one window size) as a columnar rollups file."""
+    device_ids: List[str] = []
+    lookup: Dict[str, int] = {}
+    codes = array('i')
+    columns = {name: array(typecode) for name, typecode in ROLLUP_COLUMNS}
+    for bucket in buckets:
+        code = lookup.get(bucket.device_id)
+        if code is None:
+            code = lookup[bucket.device_id] = len(device_ids)
+            device_ids.append(bucket.device_id)
+        codes.append(code)
+        for name, values in columns.items():
+            value = getattr(bucket, name)
+            # Empty buckets have no peak; stored as NaN.
+            values.append(value if value is not None else math.nan)
+    write_table(path, "rollups", ROLLUP_COLUMNS, device_ids, codes, columns, row_group_size)
+
+
+def read_rollups(
+    path: str,
+    device_id: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> List[RollupBucket]:
+    """Loads the rollup buckets whose start is in [start, end), ordered by device and start."""
+    device_ids, codes, columns = read_table(path, "rollups", ROLLUP_COLUMNS, None, device_id, start, end)
+    names = [name for name, _ in ROLLUP_COLUMNS]
+    buckets = [
+        RollupBucket(device_ids[code], *values)
+        for code, values in zip(codes, zip(*(columns[name] for name in names)))
+    ]
+    for bucket in buckets:
+        if math.isnan(bucket.peak_watts):
+            bucket.peak_watts = None
+    return buckets
@@ -1,31 +1,371 @@
-import csv
-from typing import List
+import glob
+import os
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from models.reading import EnergyReading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from models.reading import EnergyReading, to_epoch_seconds
+from models.reading_batch import ReadingBatch
+from models.reading_index import ReadingIndex
+from services.binary_store import convert_csv_to_binary, open_binary
+from services.columnar_store import DEFAULT_ROW_GROUP_SIZE, READING_COLUMNS, read_readings, read_table, write_readings
+from services.file_follower import DEFAULT_POLL_INTERVAL, ReadingFileFollower
+from services.reading_parser import (
+    EpochRow,
+    TimestampDecoder,
+    iter_fields,
+    parse_epoch_row,
+    parse_epoch_rows,
+    split_line,
+)
+
+DEFAULT_BATCH_SIZE = 65536
+
+
+def _load_batch_buffers(filepath: str) -> Dict[str, object]:
+    """Process-pool worker: parses one file and returns compact column buffers."""
+    return DataIngestionService().load_batch(filepath).to_buffers()
+
 
 class DataIngestionService:
     def load_file(self, filepath: str) -> List[EnergyReading]:
-        readings = []
+        """
+        Loads a readings CSV as EnergyReading objects.
+
+        The header line is skipped, as are rows without exactly five fields
+        or with values that do not parse.
+
+        Args:
+            filepath: Path to the readings CSV file.
+
+        Returns:
+            One EnergyReading per valid row, in file order (empty if the file
+            does not exist).
+        """
+        return list(self.iter_readings(filepath))
+
+    def load_batch(self, filepath: str) -> ReadingBatch:
+        """
+        Loads a readings CSV straight into a columnar ReadingBatch.
+
+        Rows are validated exactly like `load_file`, but no per-row
+        EnergyReading objects are created.
+
+        Args:
+            filepath: Path to the readings CSV file.
+
+        Returns:
+            A ReadingBatch with one row per valid reading (empty if the file
+            does not exist).
+        """
+        batch = ReadingBatch()
+        batch.extend_rows(self._iter_epoch_rows(filepath))
+        return batch
+
+    def load_index(self, filepath: str) -> ReadingIndex:
+        """
+        Loads a readings CSV and indexes it by device and timestamp.
+
+        Args:
+            filepath: Path to the readings CSV file.
+
+        Returns:
+            A ReadingIndex over the loaded ReadingBatch.
+        """
+        return ReadingIndex(self.load_batch(filepath))
+
+    def load_many(self, paths: Union[str, Iterable[str]], workers: Optional[int] = None) -> ReadingBatch:
+        """
+        Loads several readings CSV files in parallel and merges them.
+
+        Each file is parsed in a separate worker process, which sends its rows
+        back as raw column buffers rather than pickled EnergyReading objects.
+
+        Args:
+            paths: Either a glob pattern (e.g. "data/*.csv") or an iterable of
+                file paths.
+            workers: Number of worker processes. Defaults to the CPU count;
+                1 parses the files in the current process.
+
+        Returns:
+            A single ReadingBatch with all rows, ordered by timestamp.
+        """
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(paths))
+        else:
+            paths = list(paths)
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+
+        merged = ReadingBatch()
+        if workers <= 1:
+            for path in paths:
+                merged.extend(self.load_batch(path))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for buffers in pool.map(_load_batch_buffers, paths):
+                    merged.extend(ReadingBatch.from_buffers(buffers))
+        if merged.is_time_sorted():
+            return merged
+        # Each file is usually already time-ordered, so the sort mostly
+        # merges pre-sorted runs.
+        return merged.sorted_by_time()
+
+    def load_binary(self, filepath: str) -> ReadingBatch:
+        """
+        Opens a pre-converted binary readings file via mmap.
+
+        See `services/binary_store.py` for the format. The returned batch is
+        read-only and shares memory with the mapped file.
+
+        Args:
+            filepath: Path to a binary readings file.
+
+        Returns:
+            A read-only ReadingBatch.
+        """
+        return open_binary(filepath)
+
+    def convert_to_binary(self, csv_path: str, bin_path: str) -> int:
+        """
+        Converts a readings CSV into the binary format read by `load_binary`.
+
+        Args:
+            csv_path: Source readings CSV.
+            bin_path: Destination binary file; overwritten if it exists.
+
+        Returns:
+            The number of readings written.
+        """
+        return convert_csv_to_binary(csv_path, bin_path)
+
+    def write_columnar(self, batch: ReadingBatch, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> None:
+        """
+        Writes readings in a columnar format for fast, selective re-reading.
+
+        A `.parquet` path writes Parquet (requires pyarrow); any other path
+        uses the stdlib compressed columnar format. See
+        `services/columnar_store.py`.
+
+        Args:
+            batch: The readings to write.
+            path: Destination file; overwritten if it exists.
+            row_group_size: Maximum rows per row group.
+        """
+        write_readings(batch, path, row_group_size)
+
+    def convert_to_columnar(self, csv_path: str, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> int:
+        """
+        Converts a readings CSV into a columnar file read by `load_columnar`.
+
+        Returns:
+            The number of readings written.
+        """
+        batch = self.load_batch(csv_path)
+        write_readings(batch, path, row_group_size)
+        return len(batch)
+
+    def load_columnar(
+        self,
+        path: str,
+        device_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> ReadingBatch:
+        """
+        Loads readings from a columnar file, reading only matching row groups.
+
+        Args:
+            path: A file written by `write_columnar`.
+            device_id: Only load this device's readings.
+            start: Inclusive lower time bound, or None for no bound.
+            end: Exclusive upper time bound, or None for no bound.
+
+        Returns:
+            A ReadingBatch ordered by device, then timestamp.
+        """
+        return read_readings(path, device_id, *self._epoch_bounds(start, end))
+
+    def load_columns(
+        self,
+        path: str,
+        columns: Sequence[str],
+        device_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[str, Sequence]:
+        """
+        Loads only some columns of the matching readings from a columnar file.
+
+        E.g. `load_columns(path, ["voltage"], "DEV004", last_monday, today)`
+        decompresses just DEV004's voltage (and timestamp) chunks for row
+        groups overlapping that week.
+
+        Args:
+            path: A file written by `write_columnar`.
+            columns: Any of "timestamps", "device_id", "voltage", "current"
+                and "power_factor".
+            device_id: Only load this device's readings.
+            start: Inclusive lower time bound, or None for no bound.
+            end: Exclusive upper time bound, or None for no bound.
+
+        Returns:
+            The requested columns by name, aligned row for row. Timestamps
+            are epoch seconds.
+
+        Raises:
+            ValueError: If an unknown column is requested.
+        """
+        numeric = [name for name in columns if name != "device_id"]
+        device_ids, codes, values = read_table(
+            path, "readings", READING_COLUMNS, numeric, device_id, *self._epoch_bounds(start, end)
+        )
+        if "device_id" in columns:
+            values["device_id"] = [device_ids[code] for code in codes]
+        return {name: values[name] for name in columns}
+
+    @staticmethod
+    def _epoch_bounds(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[int], Optional[int]]:
+        return (
+            to_epoch_seconds(start) if start is not None else None,
+            to_epoch_seconds(end) if end is not None else None,
+        )
+
+    def iter_readings(self, filepath: str) -> Iterator[EnergyReading]:
+        """
+        Lazily yields readings from a CSV file, one row at a time.
+
+        Only the current line is held in memory, so arbitrarily large files
+        can be processed with flat memory usage.
+
+        Args:
+            filepath: Path to the readings CSV file.
+
+        Yields:
+            One EnergyReading per valid row, in file order.
+        """
+        for epoch_seconds, device_id, voltage, current, power_factor in self._iter_epoch_rows(filepath):
+            yield EnergyReading(
+                timestamp=epoch_seconds,
+                device_id=device_id,
+                voltage=voltage,
+                current=current,
+                power_factor=power_factor
+            )
+
+    def iter_batches(self, filepath: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[ReadingBatch]:
+        """
+        Lazily yields fixed-size columnar chunks of a CSV file.
+
+        Args:
+            filepath: Path to the readings CSV file.
+            batch_size: Maximum number of rows per yielded batch. Only the
+                last batch may be shorter.
+
+        Yields:
+            ReadingBatch chunks, in file order.
+
+        Raises:
+            ValueError: If batch_size is not positive.
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+
+        rows = self._iter_epoch_rows(filepath)
+        while True:
+            batch = ReadingBatch()
+            batch.extend_rows(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def follow(
+        self,
+        filepath: str,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        stop: Optional[Callable[[], bool]] = None,
+    ) -> Iterator[ReadingBatch]:
+        """
+        Follows a growing readings CSV, yielding only newly appended rows.
+
+        The first batch holds the existing contents; after that each poll
+        parses only the bytes appended since the previous one, handling
+        rotation and truncation (see ReadingFileFollower). Feed the batches
+        to incremental consumers such as `AnalyticsAccumulator.update_batch`,
+        `RollupEngine.update` or `AnomalyDetector.detect`.
+
+        Args:
+            filepath: Path to the readings CSV file; it may not exist yet.
+            poll_interval: Seconds to sleep between polls.
+            stop: Called after every poll; following ends when it returns True.
+
+        Yields:
+            Non-empty ReadingBatch chunks, in file order.
+        """
+        with ReadingFileFollower(filepath) as follower:
+            yield from follower.follow(poll_interval, stop)
+
+    def read_page(
+        self,
+        filepath: str,
+        offset: int = 0,
+        limit: int = 100,
+        device_id: Optional[str] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> Tuple[List[EpochRow], Optional[int]]:
+        """
+        Reads up to `limit` matching rows starting at a byte offset.
+
+        The file is opened with `seek(offset)`, so deep pages cost the same
+        as the first one. Filters are applied while scanning: the device id is
+        compared before any numeric field is parsed.
+
+        Args:
+            filepath: Path to the readings CSV file.
+            offset: Byte offset of the first line to read; 0 means the start
+                of the file (the header is skipped).
+            limit: Maximum number of rows to return.
+            device_id: Only return rows for this device.
+            start: Only return rows at or after this epoch second.
+            end: Only return rows before this epoch second.
+
+        Returns:
+            A tuple of (rows, next_offset). next_offset is the byte offset to
+            resume from, or None once the end of the file has been reached.
+            Missing files yield ([], None).
+        """
+        rows: List[EpochRow] = []
+        decoder = TimestampDecoder()
         try:
-            with open(filepath, 'r') as f:
-                # SKIP HEADER
-                next(f)
-                for line in f:
-                    # BUG: Naive splitting will fail on quoted strings or varying formats
-                    parts = line.strip().split(',')
-                    if len(parts) != 5:
+            with open(filepath, 'rb') as f:
+                if offset <= 0:
+                    offset = len(f.readline())
+                else:
+                    f.seek(offset)
+                while len(rows) < limit:
+                    line = f.readline()
+                    if not line:
+                        return rows, None
+                    offset += len(line)
+                    parts = split_line(line.decode('utf-8', errors='replace'))
+                    if device_id is not None and (len(parts) != 5 or parts[1] != device_id):
                         continue
-                    
-                    try:
-                        readings.append(EnergyReading(
-                            timestamp=datetime.strptime(parts[0], "%Y-%m-%d %H:%M:%S"),
-                            device_id=parts[1],
-                            voltage=float(parts[2]),
-                            current=float(parts[3]),
-                            power_factor=float(parts[4])
-                        ))
-                    except (ValueError, IndexError):
+                    row = parse_epoch_row(parts, decoder)
+                    if row is None:
                         continue
+                    if (start is not None and row[0] < start) or (end is not None and row[0] >= end):
+                        continue
+                    rows.append(row)
+                if not f.read(1):
+                    return rows, None
+        except FileNotFoundError:
+            return [], None
+        return rows, offset
+
+    def _iter_epoch_rows(self, filepath: str) -> Iterator[EpochRow]:
+        try:
+            with open(filepath, 'r') as f:
+                next(f, None)
+                yield from parse_epoch_rows(iter_fields(f), TimestampDecoder())
         except FileNotFoundError:
             pass
-        return readings
@@ -0,0 +1,153 @@
+import csv
+import json
+from array import array
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+from models.device import Device
+from models.reading_batch import ReadingBatch
+
+JOIN_ATTRIBUTES = ("name", "location", "power_rating_watts", "is_active", "device_type")
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def _device_from_record(record: Dict[str, Any]) -> Device:
+    return Device(
+        device_id=str(record["device_id"]),
+        name=record.get("name", ""),
+        location=record.get("location", ""),
+        power_rating_watts=float(record.get("power_rating_watts") or 0.0),
+        is_active=_parse_bool(record.get("is_active", False)),
+        device_type=record.get("device_type", ""),
+    )
+
+
+class DeviceRegistry:
+    """
+    In-memory registry of devices keyed by interned device_id.
+
+    Lookups are a single dict access. Joins against a ReadingBatch resolve
+    each distinct device once through the batch's device dictionary and then
+    fan out per row by integer code, so no per-row dicts are built.
+    """
+
+    def __init__(self, devices: Iterable[Device] = ()):
+        self._devices: Dict[str, Device] = {}
+        for device in devices:
+            self.add(device)
+
+    @classmethod
+    def load(cls, filepath: str) -> "DeviceRegistry":
+        """
+        Loads devices from a JSON (list of objects) or CSV file.
+
+        Both formats use the Device field names as keys/columns; only
+        device_id is required.
+
+        Args:
+            filepath: Path to a .json or .csv file.
+
+        Returns:
+            A populated DeviceRegistry.
+
+        Raises:
+            ValueError: If the file extension is not supported, a JSON file
+                does not hold a list of objects, or a record has no device_id.
+        """
+        if filepath.lower().endswith(".json"):
+            with open(filepath, "r") as f:
+                records = json.load(f)
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                raise ValueError(f"Expected a JSON list of device objects in {filepath}")
+        elif filepath.lower().endswith(".csv"):
+            with open(filepath, "r", newline="") as f:
+                records = list(csv.DictReader(f))
+        else:
+            raise ValueError(f"Unsupported device file format: {filepath}")
+
+        try:
+            return cls(_device_from_record(record) for record in records)
+        except KeyError:
+            raise ValueError(f"Device record without device_id in {filepath}")
+
+    def add(self, device: Device) -> None:
+        """Adds or replaces a device."""
+        self._devices[device.device_id] = device
+
+    def get(self, device_id: str) -> Optional[Device]:
+        """
+        Looks up a device.
+
+        Args:
+            device_id: The id to look up.
+
+        Returns:
+            The Device, or None if it is not registered.
+        """
+        return self._devices.get(device_id)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._devices
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __iter__(self) -> Iterator[Device]:
+        return iter(self._devices.values())
+
+    def attribute_by_code(self, batch: ReadingBatch, attribute: str, default: Any = None) -> List[Any]:
+        """
+        Resolves an attribute for every entry of a batch's device dictionary.
+
+        Returns:
+            A list indexed by the batch's device code.
+
+        Raises:
+            ValueError: If the attribute is not joinable.
+        """
+        if attribute not in JOIN_ATTRIBUTES:
+            raise ValueError(f"Cannot join on device attribute: {attribute}")
+        values = []
+        for device_id in batch.device_ids:
+            device = self._devices.get(device_id)
+            values.append(getattr(device, attribute) if device is not None else default)
+        return values
+
+    def join(self, batch: ReadingBatch, attribute: str, default: Any = None) -> List[Any]:
+        """
+        Hash-joins a batch to one device attribute.
+
+        Args:
+            batch: The readings to join.
+            attribute: One of JOIN_ATTRIBUTES, e.g. "location".
+            default: Value for readings whose device is not registered.
+
+        Returns:
+            The attribute value for each row of the batch, in row order.
+        """
+        by_code = self.attribute_by_code(batch, attribute, default)
+        return [by_code[code] for code in batch.device_codes]
+
+    def group_codes(self, batch: ReadingBatch, attribute: str, default: Hashable = None) -> Tuple[array, List[Hashable]]:
+        """
+        Maps each row of a batch to a dense group id for a device attribute.
+
+        Useful for single-pass group-by aggregation: accumulate into
+        `groups[group_ids[row]]` without hashing strings per row.
+
+        Returns:
+            A tuple of (per-row group ids, group keys indexed by group id).
+        """
+        keys: List[Hashable] = []
+        key_ids: Dict[Hashable, int] = {}
+        code_to_group = array('i')
+        for value in self.attribute_by_code(batch, attribute, default):
+            group = key_ids.get(value)
+            if group is None:
+                group = key_ids[value] = len(keys)
+                keys.append(value)
+            code_to_group.append(group)
+        return array('i', (code_to_group[code] for code in batch.device_codes)), keys
@@ -0,0 +1,153 @@
+import os
+import time
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+from models.reading_batch import ReadingBatch
+from services.reading_parser import TimestampDecoder, iter_fields, parse_epoch_rows
+
+DEFAULT_POLL_INTERVAL = 1.0
+READ_CHUNK_SIZE = 1 << 20
+
+
+class ReadingFileFollower:
+    """
+    Incrementally reads a readings CSV that is being appended to, like `tail -F`.
+
+    The file stays open between polls and the follower remembers its byte
+    offset plus any trailing partial line, so each poll only reads and
+    parses bytes appended since the previous one. The header line at the
+    start of a file is skipped.
+
+    If the path starts referring to a different file (log rotation), the
+    rest of the old file is drained, its last unterminated line is parsed,
+    and reading continues from the start of the new file. If the file
+    shrinks below the current offset (truncation), reading restarts from
+    its beginning. A file truncated and regrown past the old offset between
+    two polls is indistinguishable from an append.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.offset = 0
+        self.rotations = 0
+        self.truncations = 0
+        self._file: Optional[BinaryIO] = None
+        self._identity: Optional[Tuple[int, int]] = None
+        self._partial = b""
+        self._header_pending = True
+        self._decoder = TimestampDecoder()
+
+    def __enter__(self) -> "ReadingFileFollower":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the followed file; the next `poll` reopens it from the start."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self) -> bool:
+        try:
+            f = open(self.filepath, 'rb')
+        except FileNotFoundError:
+            return False
+        st = os.fstat(f.fileno())
+        self._file, self._identity = f, (st.st_dev, st.st_ino)
+        self._restart()
+        return True
+
+    def _restart(self) -> None:
+        self.offset = 0
+        self._partial = b""
+        self._header_pending = True
+
+    def _parse(self, data: bytes, batch: ReadingBatch) -> None:
+        lines = data.decode('utf-8', errors='replace').splitlines()
+        if self._header_pending:
+            lines = lines[1:]
+            self._header_pending = False
+        batch.extend_rows(parse_epoch_rows(iter_fields(lines), self._decoder))
+
+    def _read_new(self, batch: ReadingBatch) -> None:
+        while True:
+            chunk = self._file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            self.offset += len(chunk)
+            data = self._partial + chunk
+            cut = data.rfind(b"\n") + 1
+            self._partial = data[cut:]
+            if cut:
+                self._parse(data[:cut], batch)
+
+    @property
+    def has_partial_line(self) -> bool:
+        """True if the file currently ends in a line without a newline."""
+        return bool(self._partial)
+
+    def flush(self) -> ReadingBatch:
+        """
+        Parses a trailing line that has no newline yet as if it were complete.
+
+        Use this when the current contents are final (e.g. an initial load
+        that must match `DataIngestionService.load_index`). Bytes appended
+        to that line afterwards would be read as a separate line, so a
+        caller that keeps following should start over with a new follower
+        once the file grows.
+        """
+        batch = ReadingBatch()
+        if self._partial:
+            self._parse(self._partial + b"\n", batch)
+            self._partial = b""
+        return batch
+
+    def poll(self) -> ReadingBatch:
+        """
+        Reads the readings appended since the previous poll.
+
+        Returns:
+            A ReadingBatch of the new valid rows; empty if nothing complete
+            was appended or the file does not exist yet.
+        """
+        batch = ReadingBatch()
+        if self._file is None and not self._open():
+            return batch
+        self._read_new(batch)
+
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            # Rotated away and not recreated yet; keep draining the old file.
+            return batch
+        if (st.st_dev, st.st_ino) != self._identity:
+            if self._partial:
+                self._parse(self._partial + b"\n", batch)
+            self.close()
+            self.rotations += 1
+            if self._open():
+                self._read_new(batch)
+        elif st.st_size < self.offset:
+            self.truncations += 1
+            self._file.seek(0)
+            self._restart()
+            self._read_new(batch)
+        return batch
+
+    def follow(
+        self,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        stop: Optional[Callable[[], bool]] = None,
+    ) -> Iterator[ReadingBatch]:
+        """
+        Polls forever (or until `stop()` returns True), yielding each
+        non-empty batch of new readings.
+        """
+        while True:
+            batch = self.poll()
+            if batch:
+                yield batch
+            if stop is not None and stop():
+                return
+            time.sleep(poll_interval)
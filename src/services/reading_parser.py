@@ -0,0 +1,96 @@
+import csv
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from models.reading import to_epoch_seconds
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+MINUTE_FORMAT = "%Y-%m-%d %H:%M"
+
+EpochRow = Tuple[int, str, float, float, float]
+
+
+class TimestampDecoder:
+    """
+    Decodes "YYYY-MM-DD HH:MM:SS" timestamps without calling strptime per row.
+
+    Readings arrive on a fixed cadence, so the same minute prefix (and often
+    the exact same timestamp, shared across devices) repeats constantly. The
+    decoder memoizes the epoch value of each "YYYY-MM-DD HH:MM" prefix and
+    only slices out the seconds for every row. Strings that do not have the
+    fixed 19-character shape fall back to a full strptime, so anything the
+    original parser accepted is still accepted.
+    """
+
+    def __init__(self, max_entries: int = 65536):
+        self.max_entries = max_entries
+        self._minutes: Dict[str, int] = {}
+
+    def epoch(self, text: str) -> int:
+        """
+        Returns integer epoch seconds for a timestamp string.
+
+        Raises:
+            ValueError: If the string is not a valid timestamp.
+        """
+        if len(text) != 19 or text[16] != ':':
+            return to_epoch_seconds(datetime.strptime(text, TIMESTAMP_FORMAT))
+
+        prefix = text[:16]
+        base = self._minutes.get(prefix)
+        if base is None:
+            base = to_epoch_seconds(datetime.strptime(prefix, MINUTE_FORMAT))
+            if len(self._minutes) >= self.max_entries:
+                self._minutes.clear()
+            self._minutes[prefix] = base
+
+        seconds = text[17:]
+        if not (seconds.isascii() and seconds.isdigit()) or seconds > "59":
+            raise ValueError(f"time data {text!r} does not match format {TIMESTAMP_FORMAT!r}")
+        return base + int(seconds)
+
+
+def split_line(line: str) -> List[str]:
+    """
+    Splits one CSV line into fields.
+
+    Unquoted lines (the common case) take a plain str.split; lines containing
+    quotes go through the csv module so quoted fields are handled correctly.
+    Quoting never spans lines in the readings schema, so a stray quote cannot
+    swallow the rest of the file.
+    """
+    if '"' in line:
+        return next(csv.reader((line.strip(),)), [])
+    return line.strip().split(',')
+
+
+def iter_fields(lines: Iterable[str]) -> Iterator[List[str]]:
+    """Splits an iterable of CSV lines into field lists."""
+    for line in lines:
+        yield split_line(line)
+
+
+def parse_epoch_rows(rows: Iterable[List[str]], decoder: TimestampDecoder) -> Iterator[EpochRow]:
+    """
+    Converts raw CSV fields into typed rows with epoch-second timestamps.
+
+    Rows without exactly five fields or with unparseable values are skipped.
+    """
+    decode = decoder.epoch
+    for parts in rows:
+        if len(parts) != 5:
+            continue
+        try:
+            row = (decode(parts[0]), parts[1], float(parts[2]), float(parts[3]), float(parts[4]))
+        except ValueError:
+            continue
+        yield row
+
+
+def parse_epoch_row(parts: List[str], decoder: TimestampDecoder) -> Optional[EpochRow]:
+    """Converts one row of raw CSV fields, returning None if it is invalid."""
+    if len(parts) != 5:
+        return None
+    try:
+        return decoder.epoch(parts[0]), parts[1], float(parts[2]), float(parts[3]), float(parts[4])
+    except ValueError:
+        return None
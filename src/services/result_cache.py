@@ -0,0 +1,415 @@
+import dataclasses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from models.group_summary import GroupSummary
+from models.reading_batch import ReadingBatch
+from models.reading_index import ReadingIndex
+from models.tariff import Tariff, TariffCost
+from services.analytics import EnergyAnalytics, Readings
+from services.binary_store import column_bytes
+from services.data_ingestion import DataIngestionService
+from services.device_registry import DeviceRegistry
+
+# Bump when an analytics formula or the result encoding changes so stale
+# on-disk results are ignored.
+CACHE_VERSION = 2
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 << 20
+DEFAULT_MAX_DISK_ENTRIES = 10000
+
+# A readings CSV path, or readings already in memory.
+Source = Union[str, os.PathLike, Readings]
+
+# The only classes a cached result may be decoded into.
+_RESULT_TYPES = {cls.__name__: cls for cls in (GroupSummary, TariffCost)}
+
+
+def file_fingerprint(path: Union[str, os.PathLike]) -> str:
+    """
+    Fingerprints a data file by absolute path, modification time and size.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    st = os.stat(path)
+    return f"file:{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def _unchanged(path: Union[str, os.PathLike], fingerprint: str) -> Callable[[], bool]:
+    """Returns a check that `path` still has `fingerprint` (False once it is gone)."""
+    def check() -> bool:
+        try:
+            return file_fingerprint(path) == fingerprint
+        except OSError:
+            return False
+    return check
+
+
+def batch_fingerprint(readings: Readings) -> str:
+    """Fingerprints readings by hashing their column bytes and device dictionary."""
+    if isinstance(readings, ReadingIndex):
+        readings = readings.batch
+    elif not isinstance(readings, ReadingBatch):
+        readings = ReadingBatch.from_readings(readings)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\0".join(readings.device_ids).encode())
+    for name, typecode in (
+        ("timestamps", "q"),
+        ("voltage", "d"),
+        ("current", "d"),
+        ("power_factor", "d"),
+        ("device_codes", "i"),
+    ):
+        digest.update(column_bytes(getattr(readings, name), typecode))
+    return f"batch:{digest.hexdigest()}"
+
+
+def _tag(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_tag(item) for item in value]
+    if isinstance(value, tuple):
+        return {"tuple": [_tag(item) for item in value]}
+    if isinstance(value, dict):
+        return {"dict": [[_tag(k), _tag(v)] for k, v in value.items()]}
+    name = type(value).__name__
+    if _RESULT_TYPES.get(name) is type(value):
+        return {name: {f.name: _tag(getattr(value, f.name)) for f in dataclasses.fields(value)}}
+    raise TypeError(f"Cannot cache a result of type {name}")
+
+
+def _untag(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_untag(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    (name, body), = value.items()
+    if name == "tuple":
+        return tuple(_untag(item) for item in body)
+    if name == "dict":
+        return {_untag(k): _untag(v) for k, v in body}
+    return _RESULT_TYPES[name](**{field: _untag(item) for field, item in body.items()})
+
+
+def encode_result(result: Any) -> bytes:
+    """
+    Serializes an analytics result as JSON.
+
+    Numbers, strings, None, lists, tuples, dicts and the result dataclasses
+    (GroupSummary, TariffCost) are supported; tuples, dicts and dataclasses
+    are tagged so they decode to the same types.
+
+    Raises:
+        TypeError: If the result contains any other type.
+    """
+    return json.dumps(_tag(result), separators=(",", ":")).encode("utf-8")
+
+
+def decode_result(data: bytes) -> Any:
+    """
+    Inverse of `encode_result`. Unlike unpickling, decoding only ever builds
+    plain values and the result dataclasses, so a tampered cache file cannot
+    run code.
+
+    Raises:
+        ValueError: If `data` was not produced by `encode_result`.
+    """
+    try:
+        return _untag(json.loads(data))
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Not an encoded result: {e}") from e
+
+
+class ResultCache:
+    """
+    LRU cache of analytics results, optionally backed by a file on disk.
+
+    Results are stored encoded (see `encode_result`), so callers never share
+    mutable results and the memory bound is exact: the least recently used entries are evicted
+    once there are more than `max_entries` or they total more than
+    `max_bytes`. With `path`, results are also written to a SQLite file
+    (capped at `max_disk_entries`, least recently used first) so that later
+    processes on the same data start warm. The cache is thread-safe.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        path: Optional[str] = None,
+        max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._disk = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL, used REAL NOT NULL)"
+            )
+            self._disk.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self) -> None:
+        """
+        Closes the disk file, if any. Results already in memory stay
+        available; new results are only kept in memory from then on.
+        """
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    @staticmethod
+    def make_key(fingerprint: str, method: str, params: Any) -> str:
+        """Builds a cache key; `params` must have a deterministic repr."""
+        return hashlib.sha256(repr((CACHE_VERSION, fingerprint, method, params)).encode()).hexdigest()
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        still_valid: Optional[Callable[[], bool]] = None,
+    ) -> Any:
+        """
+        Returns the cached result for `key`, calling `compute()` on a miss.
+
+        Args:
+            key: A key from `make_key`.
+            compute: Computes the result on a miss.
+            still_valid: Called after `compute()`; the result is returned
+                but not cached unless it returns True, e.g. because the
+                input changed while the result was being computed.
+        """
+        data = self._lookup(key)
+        if data is not None:
+            return decode_result(data)
+        result = compute()
+        if still_valid is None or still_valid():
+            self._store(key, encode_result(result))
+        return result
+
+    def clear(self) -> None:
+        """Drops every cached result, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM results")
+
+    def _lookup(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            if self._disk is not None:
+                row = self._disk.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._disk.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+                    data = row[0]
+                    self._remember(key, data)
+                    self.hits += 1
+                    return data
+            self.misses += 1
+            return None
+
+    def _store(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._remember(key, data)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO results (key, value, used) VALUES (?, ?, ?)", (key, data, time.time())
+                )
+                self._disk.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+
+class CachedAnalytics:
+    """
+    Memoizes EnergyAnalytics results per data source, method and parameters.
+
+    A source is either a readings CSV path, fingerprinted by path, mtime and
+    size (on a hit the file is not even parsed; a result is not cached if
+    the file changed while it was parsed), or readings already in
+    memory, fingerprinted by hashing their columns. Pass `fingerprint` to
+    reuse one computed elsewhere. The analytics instance's `base_rate` is
+    part of every key, as are arguments such as a budget or tariffs.
+
+    Unlike DataIngestionService, which treats a missing CSV as empty, a
+    missing path cannot be fingerprinted and raises FileNotFoundError,
+    unless `fingerprint` is given.
+    """
+
+    def __init__(self, analytics: Optional[EnergyAnalytics] = None, cache: Optional[ResultCache] = None):
+        self.analytics = analytics or EnergyAnalytics()
+        self.cache = cache if cache is not None else ResultCache()
+
+    def _call(
+        self,
+        method: str,
+        source: Source,
+        args: tuple = (),
+        fingerprint: Optional[str] = None,
+        key_args: Optional[tuple] = None,
+    ) -> Any:
+        is_path = isinstance(source, (str, os.PathLike))
+        still_valid = None
+        if fingerprint is None and is_path:
+            fingerprint = file_fingerprint(source)
+            still_valid = _unchanged(source, fingerprint)
+        elif fingerprint is None:
+            fingerprint = batch_fingerprint(source)
+        params = (self.analytics.base_rate, args if key_args is None else key_args)
+
+        def compute() -> Any:
+            readings = DataIngestionService().load_batch(os.fspath(source)) if is_path else source
+            return getattr(self.analytics, method)(readings, *args)
+
+        return self.cache.get_or_compute(ResultCache.make_key(fingerprint, method, params), compute, still_valid)
+
+    def calculate_complex_efficiency_score(self, source: Source, fingerprint: Optional[str] = None) -> float:
+        """
+        Cached `EnergyAnalytics.calculate_complex_efficiency_score`.
+
+        Args:
+            source: A readings CSV path or readings in memory.
+            fingerprint: Identifies the data instead of fingerprinting `source`.
+
+        Returns:
+            The mean efficiency score of the readings.
+
+        Raises:
+            FileNotFoundError: If `source` is a missing path and no
+                fingerprint is given.
+        """
+        return self._call("calculate_complex_efficiency_score", source, fingerprint=fingerprint)
+
+    def project_monthly_cost(self, source: Source, fingerprint: Optional[str] = None) -> float:
+        """
+        Cached `EnergyAnalytics.project_monthly_cost`.
+
+        Args:
+            source: A readings CSV path or readings in memory.
+            fingerprint: Identifies the data instead of fingerprinting `source`.
+
+        Returns:
+            The projected cost of 30 days at the readings' average power.
+
+        Raises:
+            FileNotFoundError: If `source` is a missing path and no
+                fingerprint is given.
+        """
+        return self._call("project_monthly_cost", source, fingerprint=fingerprint)
+
+    def calculate_score_and_cost(self, source: Source, fingerprint: Optional[str] = None) -> Tuple[float, float]:
+        """
+        Cached `EnergyAnalytics.calculate_score_and_cost`.
+
+        Args:
+            source: A readings CSV path or readings in memory.
+            fingerprint: Identifies the data instead of fingerprinting `source`.
+
+        Returns:
+            A tuple of (efficiency_score, projected_monthly_cost).
+
+        Raises:
+            FileNotFoundError: If `source` is a missing path and no
+                fingerprint is given.
+        """
+        return self._call("calculate_score_and_cost", source, fingerprint=fingerprint)
+
+    def check_budget_exceeded(
+        self, source: Source, budget: float, fingerprint: Optional[str] = None
+    ) -> Tuple[bool, float]:
+        """
+        Cached `EnergyAnalytics.check_budget_exceeded`; the budget is part of the key.
+
+        Args:
+            source: A readings CSV path or readings in memory.
+            budget: Monthly budget to compare the projected cost against.
+            fingerprint: Identifies the data instead of fingerprinting `source`.
+
+        Returns:
+            A tuple of (is_exceeded, projected_cost).
+
+        Raises:
+            FileNotFoundError: If `source` is a missing path and no
+                fingerprint is given.
+        """
+        return self._call("check_budget_exceeded", source, (budget,), fingerprint)
+
+    def group_by(
+        self,
+        source: Source,
+        key: str = "device_id",
+        registry: Optional[DeviceRegistry] = None,
+        fingerprint: Optional[str] = None,
+    ) -> List[GroupSummary]:
+        """
+        Cached `EnergyAnalytics.group_by`. The registry contents are part of
+        the key, so edits to device attributes invalidate grouped results.
+
+        Raises:
+            FileNotFoundError: If `source` is a missing path and no
+                fingerprint is given.
+        """
+        devices = tuple(sorted(repr(device) for device in registry)) if registry is not None else None
+        return self._call("group_by", source, (key, registry), fingerprint, (key, devices))
+
+    def compare_tariffs(
+        self, source: Source, tariffs: Iterable[Tariff], fingerprint: Optional[str] = None
+    ) -> Dict[str, TariffCost]:
+        """
+        Cached `EnergyAnalytics.compare_tariffs`; the tariffs are part of the key.
+
+        Args:
+            source: A readings CSV path or readings in memory.
+            tariffs: The tariffs to price the readings under.
+            fingerprint: Identifies the data instead of fingerprinting `source`.
+
+        Returns:
+            A dict mapping tariff name to its TariffCost.
+
+        Raises:
+            FileNotFoundError: If `source` is a missing path and no
+                fingerprint is given.
+        """
+        return self._call("compare_tariffs", source, (tuple(tariffs),), fingerprint)
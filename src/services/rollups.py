@@ -0,0 +1,132 @@
+from dataclasses import replace
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from models.reading import EnergyReading, from_epoch_seconds, to_epoch_seconds
+from models.reading_batch import ReadingBatch
+from models.rollup_bucket import RollupBucket
+
+BASE_WINDOW_SECONDS = 15 * 60
+
+# Each coarser window is built from the one before it, never from raw readings.
+WINDOWS = ("15min", "hour", "day", "month")
+_PARENT = {"hour": "15min", "day": "hour", "month": "day"}
+_WIDTH = {"15min": BASE_WINDOW_SECONDS, "hour": 3600, "day": 86400}
+
+# Gaps longer than this are treated as the device being offline and are not
+# integrated into kWh.
+DEFAULT_MAX_GAP_SECONDS = 3600
+
+BucketKey = Tuple[str, int]
+
+
+def window_start(epoch_seconds: int, window: str) -> int:
+    """Returns the start (epoch seconds) of the window containing a timestamp."""
+    if window == "month":
+        ts = from_epoch_seconds(epoch_seconds)
+        return to_epoch_seconds(datetime(ts.year, ts.month, 1))
+    width = _WIDTH[window]
+    return epoch_seconds - epoch_seconds % width
+
+
+class RollupEngine:
+    """
+    Buckets reading streams into tumbling windows per device.
+
+    Readings are folded into 15-minute base buckets as they arrive. Energy is
+    integrated over the actual gap between consecutive readings of a device
+    (the earlier reading's power is held until the next one, and the interval
+    is split across bucket boundaries). Hourly, daily and monthly rollups are
+    derived from the finer level, so querying them never rescans readings.
+
+    Readings of a device should arrive in timestamp order; an out-of-order
+    reading still counts towards averages and peaks but adds no energy.
+    """
+
+    def __init__(self, max_gap_seconds: int = DEFAULT_MAX_GAP_SECONDS):
+        self.max_gap_seconds = max_gap_seconds
+        self._base: Dict[BucketKey, RollupBucket] = {}
+        self._last: Dict[str, Tuple[int, float]] = {}
+        self._cache: Dict[str, Dict[BucketKey, RollupBucket]] = {}
+
+    def _bucket(self, device_id: str, start: int) -> RollupBucket:
+        key = (device_id, start)
+        bucket = self._base.get(key)
+        if bucket is None:
+            bucket = self._base[key] = RollupBucket(device_id, start)
+        return bucket
+
+    def add(self, epoch_seconds: int, device_id: str, power_watts: float, power_factor: float) -> None:
+        """Folds a single reading into the base buckets."""
+        last = self._last.get(device_id)
+        if last is None or epoch_seconds >= last[0]:
+            if last is not None and epoch_seconds - last[0] <= self.max_gap_seconds:
+                self._integrate(device_id, last[0], epoch_seconds, last[1])
+            self._last[device_id] = (epoch_seconds, power_watts)
+
+        bucket = self._bucket(device_id, window_start(epoch_seconds, "15min"))
+        bucket.readings += 1
+        bucket.power_sum_watts += power_watts
+        if bucket.peak_watts is None or power_watts > bucket.peak_watts:
+            bucket.peak_watts = power_watts
+        bucket.power_factor_sum += power_factor
+        if self._cache:
+            self._cache.clear()
+
+    def _integrate(self, device_id: str, start: int, end: int, watts: float) -> None:
+        t = start
+        while t < end:
+            bucket_start = window_start(t, "15min")
+            segment_end = min(end, bucket_start + BASE_WINDOW_SECONDS)
+            bucket = self._bucket(device_id, bucket_start)
+            bucket.energy_wh += watts * (segment_end - t) / 3600.0
+            bucket.covered_seconds += segment_end - t
+            t = segment_end
+
+    def update(self, readings: Union[ReadingBatch, Iterable[EnergyReading]]) -> None:
+        """Folds a ReadingBatch or an iterable of readings into the rollups."""
+        if isinstance(readings, ReadingBatch):
+            device_ids = readings.device_ids
+            for epoch, code, v, c, pf in zip(
+                readings.timestamps, readings.device_codes, readings.voltage, readings.current, readings.power_factor
+            ):
+                self.add(epoch, device_ids[code], v * c * pf, pf)
+            return
+        for r in readings:
+            self.add(r.epoch_seconds, r.device_id, r.voltage * r.current * r.power_factor, r.power_factor)
+
+    def _level(self, window: str) -> Dict[BucketKey, RollupBucket]:
+        if window == "15min":
+            return self._base
+        cached = self._cache.get(window)
+        if cached is not None:
+            return cached
+
+        level: Dict[BucketKey, RollupBucket] = {}
+        for (device_id, start), finer in self._level(_PARENT[window]).items():
+            key = (device_id, window_start(start, window))
+            bucket = level.get(key)
+            if bucket is None:
+                bucket = level[key] = RollupBucket(device_id, key[1])
+            bucket.merge(finer)
+        self._cache[window] = level
+        return level
+
+    def rollup(self, window: str, device_id: Optional[str] = None) -> List[RollupBucket]:
+        """
+        Returns copies of the buckets of one window size, ordered by device
+        and start. Buckets that only received energy from a gap spanning them
+        have no readings and a peak of None.
+
+        Args:
+            window: One of "15min", "hour", "day" or "month".
+            device_id: Restrict the result to a single device.
+
+        Raises:
+            ValueError: If the window size is unknown.
+        """
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown rollup window: {window}")
+        buckets = self._level(window).values()
+        if device_id is not None:
+            buckets = [b for b in buckets if b.device_id == device_id]
+        return [replace(b) for b in sorted(buckets, key=lambda b: (b.device_id, b.start))]
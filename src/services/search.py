@@ -0,0 +1,168 @@
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from models.device import Device
+
+# Field weights for text matches; an exact id match should always win.
+FIELD_WEIGHTS = {"device_id": 5.0, "device_type": 3.0, "name": 2.0, "location": 1.5}
+
+# Query attribute -> per-device statistic it filters on.
+ATTRIBUTES = {
+    "power": "avg_power_watts",
+    "watts": "avg_power_watts",
+    "peak": "peak_power_watts",
+    "pf": "avg_power_factor",
+    "kwh": "kwh",
+    "efficiency": "efficiency_score",
+    "cost": "projected_monthly_cost",
+    "readings": "readings",
+}
+_UNIT_SCALE = {"w": 1.0, "kw": 1000.0, "kwh": 1.0}
+
+_PREDICATE = re.compile(
+    r"\b(" + "|".join(ATTRIBUTES) + r")\s*(>=|<=|>|<|=)\s*(\d+(?:\.\d+)?)\s*(kwh|kw|w)?\b",
+    re.IGNORECASE,
+)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words that ask for the biggest consumers rather than naming a device.
+_RANK_BY_POWER = {"high", "highest", "top", "consumption", "consuming", "usage"}
+_STOPWORDS = {"a", "all", "and", "any", "device", "devices", "find", "for", "in", "list", "me", "of", "show", "the", "with"}
+
+Predicate = Tuple[str, str, float]
+
+
+@dataclass
+class SearchResult:
+    device_id: str
+    score: float
+    device: Optional[Device] = None
+    stats: dict = field(default_factory=dict)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase alphanumeric terms.
+
+    "Living Room HVAC-2" -> ["living", "room", "hvac", "2"]
+    """
+    return _TOKEN.findall(text.lower())
+
+
+def parse_query(query: str) -> Tuple[List[str], List[Predicate]]:
+    """
+    Splits a query into free-text terms and numeric predicates.
+
+    "hvac power > 2kW" -> (["hvac"], [("avg_power_watts", ">", 2000.0)])
+    """
+    predicates = []
+    for attribute, op, value, unit in _PREDICATE.findall(query):
+        scale = _UNIT_SCALE[unit.lower()] if unit else 1.0
+        predicates.append((ATTRIBUTES[attribute.lower()], op, float(value) * scale))
+    terms = tokenize(_PREDICATE.sub(" ", query))
+    return terms, predicates
+
+
+class DeviceSearchIndex:
+    """
+    Inverted index over device metadata plus sorted per-statistic columns.
+
+    Text terms are looked up in the inverted index (with prefix matching on
+    a sorted vocabulary), and numeric predicates are answered by bisecting
+    the pre-sorted statistic columns. Both are built once, so queries never
+    scan readings.
+    """
+
+    def __init__(self, devices: Iterable[Device], stats: Dict[str, dict]):
+        self.devices: Dict[str, Device] = {d.device_id: d for d in devices}
+        self.stats = stats
+
+        postings: Dict[str, Dict[str, float]] = {}
+        for device in self.devices.values():
+            for field_name, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(str(getattr(device, field_name))):
+                    device_weights = postings.setdefault(token, {})
+                    device_weights[device.device_id] = max(device_weights.get(device.device_id, 0.0), weight)
+        for device_id in stats:
+            for token in tokenize(device_id):
+                postings.setdefault(token, {}).setdefault(device_id, FIELD_WEIGHTS["device_id"])
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+
+        self._columns: Dict[str, Tuple[List[float], List[str]]] = {}
+        for stat in set(ATTRIBUTES.values()):
+            pairs = sorted((s[stat], device_id) for device_id, s in stats.items() if s.get(stat) is not None)
+            self._columns[stat] = ([value for value, _ in pairs], [device_id for _, device_id in pairs])
+
+    def _match_term(self, term: str) -> Dict[str, float]:
+        exact = self._postings.get(term)
+        if exact is not None or len(term) < 3:
+            return exact or {}
+        # Prefix match, e.g. "thermo" -> "thermostat", at a small discount.
+        matches: Dict[str, float] = {}
+        i = bisect_left(self._vocabulary, term)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+            for device_id, weight in self._postings[self._vocabulary[i]].items():
+                matches[device_id] = max(matches.get(device_id, 0.0), weight * 0.5)
+            i += 1
+        return matches
+
+    def _match_predicate(self, stat: str, op: str, value: float) -> Set[str]:
+        values, device_ids = self._columns.get(stat, ([], []))
+        if op == ">":
+            return set(device_ids[bisect_right(values, value):])
+        if op == ">=":
+            return set(device_ids[bisect_left(values, value):])
+        if op == "<":
+            return set(device_ids[:bisect_left(values, value)])
+        if op == "<=":
+            return set(device_ids[:bisect_right(values, value)])
+        return set(device_ids[bisect_left(values, value):bisect_right(values, value)])
+
+    def search(self, query: str, limit: int = 10) -> List[SearchResult]:
+        """
+        Searches devices by text and numeric predicates.
+
+        Args:
+            query: Free text (matched against id, name, type and location)
+                and/or predicates such as "power > 2kW" or "pf < 0.9".
+            limit: Maximum number of results.
+
+        Returns:
+            Matching devices, best first. Text matches are ranked by summed
+            field weights; ties, and queries that only filter or ask for
+            "high consumption", are ranked by average power.
+        """
+        terms, predicates = parse_query(query)
+        rank_by_power = any(t in _RANK_BY_POWER for t in terms)
+        terms = [t for t in terms if t not in _RANK_BY_POWER and t not in _STOPWORDS]
+
+        scores: Optional[Dict[str, float]] = None
+        if terms:
+            scores = {}
+            for term in terms:
+                for device_id, weight in self._match_term(term).items():
+                    scores[device_id] = scores.get(device_id, 0.0) + weight
+        for stat, op, value in predicates:
+            allowed = self._match_predicate(stat, op, value)
+            if scores is None:
+                scores = {device_id: 0.0 for device_id in allowed}
+            else:
+                scores = {device_id: s for device_id, s in scores.items() if device_id in allowed}
+        if scores is None:
+            if not rank_by_power:
+                return []
+            scores = {device_id: 0.0 for device_id in self.stats}
+
+        def power(device_id: str) -> float:
+            return self.stats.get(device_id, {}).get("avg_power_watts", 0.0)
+
+        if rank_by_power:
+            ranked = sorted(scores, key=lambda d: (power(d), scores[d]), reverse=True)
+        else:
+            ranked = sorted(scores, key=lambda d: (scores[d], power(d)), reverse=True)
+        return [
+            SearchResult(device_id, scores[device_id], self.devices.get(device_id), self.stats.get(device_id, {}))
+            for device_id in ranked[:limit]
+        ]
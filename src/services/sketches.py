@@ -0,0 +1,330 @@
+import heapq
+import math
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from models.peak_demand import PeakDemand
+from models.reading import EnergyReading
+from models.reading_batch import ReadingBatch
+from services.rollups import BASE_WINDOW_SECONDS
+
+DEFAULT_COMPRESSION = 100.0
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_TOP_K = 10
+
+Centroid = Tuple[float, float]  # (mean, weight)
+Peak = Tuple[float, int, str]  # (avg_watts, interval start, device_id)
+
+
+class TDigest:
+    """
+    Merging t-digest for approximate quantiles in bounded memory.
+
+    Values are buffered and periodically merged into at most about
+    `compression` centroids, kept small near the tails so extreme quantiles
+    such as p99 stay accurate. Digests built on different shards can be
+    merged; the merged digest is still an approximation, with accuracy
+    comparable to (not identical to) a digest built on all values.
+    """
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self._weight = 0.0  # total weight of the centroids
+        self.min = math.inf
+        self.max = -math.inf
+        self._centroids: List[Centroid] = []
+        self._buffer: List[float] = []
+        self._buffer_limit = int(5 * compression)
+
+    @property
+    def count(self) -> int:
+        """Number of values added, including those still buffered."""
+        return int(round(self._weight)) + len(self._buffer)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, value: float) -> None:
+        """
+        Adds one value; the buffer is compressed once it is full.
+
+        Args:
+            value: The value to add, e.g. a reading's real power.
+        """
+        self._buffer.append(value)
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def update(self, values: Iterable[float]) -> None:
+        """Adds many values; the buffer is compressed at most once per call."""
+        self._buffer.extend(values)
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        """
+        Folds another digest into this one.
+
+        Every value of `other` is accounted for, but its centroids are
+        re-clustered rather than replayed, so quantiles of the merged digest
+        are approximate, like those of any t-digest.
+        """
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(other._centroids + [(x, 1.0) for x in other._buffer])
+
+    def _q_limit(self, q: float) -> float:
+        # k1 scale function: a centroid may span at most one unit of
+        # k(q) = compression / (2 pi) * asin(2q - 1).
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        k = min(k, self.compression / 4)
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self, extra: Sequence[Centroid] = ()) -> None:
+        if not self._buffer and not extra:
+            return
+        points = sorted(chain(self._centroids, ((x, 1.0) for x in self._buffer), extra))
+        self._buffer = []
+        total = sum(w for _, w in points)
+        self._weight = total
+        self.min = min(self.min, points[0][0])
+        self.max = max(self.max, points[-1][0])
+
+        centroids: List[Centroid] = []
+        q0 = 0.0
+        q_limit = self._q_limit(q0)
+        mean, weight = points[0]
+        for x, w in points[1:]:
+            if q0 + (weight + w) / total <= q_limit:
+                weight += w
+                mean += (x - mean) * w / weight
+            else:
+                centroids.append((mean, weight))
+                q0 += weight / total
+                q_limit = self._q_limit(q0)
+                mean, weight = x, w
+        centroids.append((mean, weight))
+        self._centroids = centroids
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the value at quantile q.
+
+        Raises:
+            ValueError: If q is outside [0, 1] or the digest is empty.
+        """
+        if not 0.0 <= q <= 1.0:
+            raise ValueError(f"Quantile must be within [0, 1]: {q}")
+        self._compress()
+        if not self._centroids:
+            raise ValueError("Cannot compute a quantile of an empty digest")
+        centroids = self._centroids
+        if len(centroids) == 1:
+            return centroids[0][0]
+
+        # Each centroid's mean sits at the middle of its weight; interpolate
+        # between neighbouring midpoints, and towards min/max at the ends.
+        total = self._weight
+        target = q * total
+        first_mean, first_weight = centroids[0]
+        if target < first_weight / 2:
+            return self.min + (first_mean - self.min) * target / (first_weight / 2)
+        cumulative = first_weight / 2
+        for (left, left_weight), (right, right_weight) in zip(centroids, centroids[1:]):
+            span = (left_weight + right_weight) / 2
+            if target < cumulative + span:
+                return left + (right - left) * (target - cumulative) / span
+            cumulative += span
+        last_mean, last_weight = centroids[-1]
+        tail = total - cumulative
+        if tail <= 0:
+            return self.max
+        return min(self.max, last_mean + (self.max - last_mean) * (target - cumulative) / tail)
+
+
+class TopK:
+    """Keeps the k largest (value, start, device_id) entries in a min-heap."""
+
+    def __init__(self, k: int = DEFAULT_TOP_K):
+        self.k = k
+        self._heap: List[Peak] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, value: float, start: int, device_id: str) -> None:
+        """
+        Offers an entry, keeping it only if it is among the k largest so far.
+
+        Args:
+            value: The value entries are ranked by, e.g. average watts.
+            start: Epoch seconds of the interval the value belongs to.
+            device_id: The device the value was measured on.
+        """
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, (value, start, device_id))
+        elif value > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (value, start, device_id))
+
+    def merge(self, other: "TopK") -> None:
+        """
+        Folds another heap into this one. The result holds the k largest
+        entries of both, exactly.
+
+        Args:
+            other: A TopK, e.g. built on another shard.
+        """
+        for entry in other._heap:
+            self.add(*entry)
+
+    def largest(self, n: Optional[int] = None) -> List[Peak]:
+        """
+        Returns the largest entries, largest first.
+
+        Args:
+            n: Maximum number of entries to return; defaults to k.
+
+        Returns:
+            (value, start, device_id) tuples.
+        """
+        return heapq.nlargest(n if n is not None else self.k, self._heap)
+
+
+class PowerProfile:
+    """
+    Per-device power quantiles and peak demand intervals over a stream.
+
+    Every reading's real power goes into its device's TDigest. Readings are
+    also averaged into 15-minute demand intervals per device; each completed
+    interval is offered to an overall and a per-device TopK heap. Memory per
+    device is bounded by the digest compression and k, regardless of how
+    many readings are seen, and profiles from different files or workers
+    can be merged.
+
+    Readings of a device should arrive in timestamp order, so that each
+    demand interval is completed before the next one starts.
+    """
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION, top_k: int = DEFAULT_TOP_K):
+        self.compression = compression
+        self.top_k = top_k
+        self.digests: Dict[str, TDigest] = {}
+        self.peaks = TopK(top_k)
+        self.device_peaks: Dict[str, TopK] = {}
+        # device_id -> [interval start, power sum, readings] of the open interval
+        self._open: Dict[str, list] = {}
+
+    def device_ids(self) -> List[str]:
+        """Returns the ids of all devices with at least one reading, sorted."""
+        return sorted(self.digests)
+
+    def _digest(self, device_id: str) -> TDigest:
+        digest = self.digests.get(device_id)
+        if digest is None:
+            digest = self.digests[device_id] = TDigest(self.compression)
+        return digest
+
+    def _close(self, device_id: str, interval: list) -> None:
+        start, power_sum, readings = interval
+        avg_watts = power_sum / readings
+        self.peaks.add(avg_watts, start, device_id)
+        peaks = self.device_peaks.get(device_id)
+        if peaks is None:
+            peaks = self.device_peaks[device_id] = TopK(self.top_k)
+        peaks.add(avg_watts, start, device_id)
+
+    def _observe(self, epoch_seconds: int, device_id: str, power_watts: float) -> None:
+        start = epoch_seconds - epoch_seconds % BASE_WINDOW_SECONDS
+        interval = self._open.get(device_id)
+        if interval is not None and interval[0] == start:
+            interval[1] += power_watts
+            interval[2] += 1
+            return
+        if interval is not None:
+            self._close(device_id, interval)
+        self._open[device_id] = [start, power_watts, 1]
+
+    def add(self, epoch_seconds: int, device_id: str, power_watts: float) -> None:
+        """Folds a single reading's real power into the profile."""
+        self._digest(device_id).add(power_watts)
+        self._observe(epoch_seconds, device_id, power_watts)
+
+    def update(self, readings: Union[ReadingBatch, Iterable[EnergyReading]]) -> None:
+        """Folds a ReadingBatch or an iterable of readings into the profile."""
+        if not isinstance(readings, ReadingBatch):
+            for r in readings:
+                self.add(r.epoch_seconds, r.device_id, r.voltage * r.current * r.power_factor)
+            return
+
+        device_ids = readings.device_ids
+        powers: List[List[float]] = [[] for _ in device_ids]
+        observe = self._observe
+        for epoch, code, v, c, pf in zip(
+            readings.timestamps, readings.device_codes, readings.voltage, readings.current, readings.power_factor
+        ):
+            watts = v * c * pf
+            powers[code].append(watts)
+            observe(epoch, device_ids[code], watts)
+        for device_id, values in zip(device_ids, powers):
+            if values:
+                self._digest(device_id).update(values)
+
+    def merge(self, other: "PowerProfile") -> None:
+        """
+        Folds a profile built on another shard into this one.
+
+        Every reading is accounted for, but merged quantiles are approximate,
+        within the error bound of the t-digest (see `TDigest.merge`). A
+        demand interval whose readings are split across shards is averaged
+        per shard, except where both shards still hold it open; peaks of
+        shards split on 15-minute boundaries (e.g. per-day files) merge
+        exactly.
+        """
+        for device_id, digest in other.digests.items():
+            self._digest(device_id).merge(digest)
+        for device_id, peaks in other.device_peaks.items():
+            self.device_peaks.setdefault(device_id, TopK(self.top_k)).merge(peaks)
+        self.peaks.merge(other.peaks)
+        for device_id, (start, power_sum, readings) in other._open.items():
+            interval = self._open.get(device_id)
+            if interval is not None and interval[0] == start:
+                interval[1] += power_sum
+                interval[2] += readings
+            elif interval is None or interval[0] < start:
+                if interval is not None:
+                    self._close(device_id, interval)
+                self._open[device_id] = [start, power_sum, readings]
+            else:
+                self._close(device_id, [start, power_sum, readings])
+
+    def quantiles(self, device_id: str, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[float, float]:
+        """
+        Estimates power quantiles (watts) for one device.
+
+        Returns:
+            A dict mapping each requested quantile to its estimate, or an
+            empty dict for a device without readings.
+        """
+        digest = self.digests.get(device_id)
+        if digest is None:
+            return {}
+        return {q: digest.quantile(q) for q in quantiles}
+
+    def peak_demand(self, n: Optional[int] = None, device_id: Optional[str] = None) -> List[PeakDemand]:
+        """
+        Returns the highest-demand 15-minute intervals, largest first.
+
+        Args:
+            n: Number of intervals, at most the profile's top_k (the default).
+            device_id: Restrict the result to a single device.
+        """
+        heap = TopK(self.top_k)
+        if device_id is None:
+            heap.merge(self.peaks)
+            open_intervals = self._open.items()
+        else:
+            if device_id in self.device_peaks:
+                heap.merge(self.device_peaks[device_id])
+            open_intervals = [(device_id, self._open[device_id])] if device_id in self._open else []
+        for open_device, (start, power_sum, readings) in open_intervals:
+            heap.add(power_sum / readings, start, open_device)
+        return [PeakDemand(d, start, watts) for watts, start, d in heap.largest(n)]
@@ -0,0 +1,478 @@
+"""
+SQLite storage backend for energy readings.
+
+Usage:
+    cd src && python -m services.sqlite_store data/readings.csv data/readings.db
+"""
+
+import math
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from models.device_totals import DeviceTotals
+from models.reading import EnergyReading, to_epoch_seconds
+from models.reading_batch import ReadingBatch
+from models.reading_index import ReadingIndex
+from services.data_ingestion import DEFAULT_BATCH_SIZE, DataIngestionService
+from services.reading_parser import EpochRow
+from services.rollups import DEFAULT_MAX_GAP_SECONDS
+
+DEFAULT_POOL_SIZE = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    device_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,  -- epoch seconds
+    voltage REAL NOT NULL,
+    current REAL NOT NULL,
+    power_factor REAL NOT NULL
+)
+"""
+# SQLite stores a NaN as NULL, so readings with a NaN value cannot go into
+# `readings`. Only their device and time are kept, so that they are still
+# counted as invalid under the same filters as stored readings.
+_SKIPPED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS skipped_readings (
+    device_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL  -- epoch seconds
+)
+"""
+# Name -> definition. readings_device is (device_id, rowid), since SQLite
+# appends the rowid to every index; it lets device-filtered pages seek.
+_INDEXES = {
+    "readings_device_time": "CREATE INDEX IF NOT EXISTS readings_device_time ON readings (device_id, timestamp)",
+    "readings_device": "CREATE INDEX IF NOT EXISTS readings_device ON readings (device_id)",
+    "readings_time": "CREATE INDEX IF NOT EXISTS readings_time ON readings (timestamp)",
+}
+_INSERT = "INSERT INTO readings (device_id, timestamp, voltage, current, power_factor) VALUES (?, ?, ?, ?, ?)"
+_INSERT_SKIPPED = "INSERT INTO skipped_readings (device_id, timestamp) VALUES (?, ?)"
+_COLUMNS = "timestamp, device_id, voltage, current, power_factor"
+
+# The rules of services/kernels.valid_rows: finite real power (9e999 is
+# +inf; SQLite turns inf * 0 into NULL, which fails the comparison),
+# non-negative voltage and current, power factor within [-1, 1]. The
+# expression can be NULL, so its negation is written `IS NOT 1`.
+_VALID = (
+    "abs(voltage * current * power_factor) < 9e999 AND voltage >= 0.0 AND current >= 0.0"
+    " AND power_factor BETWEEN -1.0 AND 1.0"
+)
+
+# Per-device sums in one pass over the valid readings, which are the ones
+# the Python kernels accept; invalid readings are only counted. kWh holds
+# each reading's power until the next reading of the device, skipping gaps
+# longer than the limit, as RollupEngine does; efficiency uses the closed
+# form of services/kernels.py. Skipped NaN readings count as invalid.
+_TOTALS = """
+WITH ordered AS (
+    SELECT device_id, timestamp, current, power_factor,
+           voltage * current * power_factor AS watts,
+           LAG(timestamp) OVER w AS prev_timestamp,
+           LAG(voltage * current * power_factor) OVER w AS prev_watts
+    FROM readings {valid}
+    WINDOW w AS (PARTITION BY device_id ORDER BY timestamp)
+),
+invalid AS (
+    SELECT device_id, COUNT(*) AS readings FROM (
+        SELECT device_id, timestamp FROM readings WHERE ({valid_rule}) IS NOT 1
+        UNION ALL
+        SELECT device_id, timestamp FROM skipped_readings
+    ) {filters}
+    GROUP BY device_id
+)
+SELECT device_id,
+       COUNT(*),
+       SUM(power_factor * exp(-4.0 * power_factor * power_factor * (1.0 - power_factor * power_factor))
+           / (1.0 + ln(1.0 + current))),
+       SUM(watts),
+       MAX(watts),
+       SUM(power_factor),
+       SUM(CASE WHEN timestamp - prev_timestamp <= ? THEN prev_watts * (timestamp - prev_timestamp) ELSE 0.0 END)
+           / 3600.0,
+       MIN(timestamp),
+       MAX(timestamp),
+       IFNULL((SELECT readings FROM invalid WHERE invalid.device_id = ordered.device_id), 0)
+FROM ordered
+GROUP BY device_id
+ORDER BY device_id
+"""
+
+
+def _prepare(conn: sqlite3.Connection) -> sqlite3.Connection:
+    # exp()/ln() are only built in when SQLite has math functions compiled in.
+    # Their results differ only outside the domain, which _VALID excludes.
+    try:
+        conn.execute("SELECT exp(0), ln(1)")
+    except sqlite3.OperationalError:
+        conn.create_function("exp", 1, math.exp, deterministic=True)
+        conn.create_function("ln", 1, math.log, deterministic=True)
+    return conn
+
+
+def _storable_rows(batch: ReadingBatch, skipped: List[Tuple[str, int]]) -> Iterator[tuple]:
+    # `v == v` is False only for NaN.
+    device_ids = batch.device_ids
+    for ts, code, v, c, pf in zip(
+        batch.timestamps, batch.device_codes, batch.voltage, batch.current, batch.power_factor
+    ):
+        if v == v and c == c and pf == pf:
+            yield device_ids[code], ts, v, c, pf
+        else:
+            skipped.append((device_ids[code], ts))
+
+
+def _epoch(value: Optional[datetime]) -> Optional[int]:
+    return to_epoch_seconds(value) if value is not None else None
+
+
+def _filters(device_id: Optional[str], start: Optional[int], end: Optional[int]) -> Tuple[List[str], list]:
+    clauses, params = [], []
+    if device_id is not None:
+        clauses.append("device_id = ?")
+        params.append(device_id)
+    if start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    return clauses, params
+
+
+def _where(clauses: List[str]) -> str:
+    return "WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of read-only connections shared across threads.
+
+    Connections are opened lazily up to `size`; when all are in use,
+    callers block until one is returned. In WAL mode readers never block
+    the writer or each other.
+    """
+
+    def __init__(self, path: str, size: int = DEFAULT_POOL_SIZE):
+        self.uri = Path(path).resolve().as_uri() + "?mode=ro"
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrows a connection for the duration of a `with` block.
+
+        Reuses an idle connection, opens a new one while fewer than `size`
+        exist, and otherwise blocks until another thread returns one.
+
+        Yields:
+            A read-only connection; it goes back to the pool on exit.
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if len(self._opened) < self.size:
+                    conn = _prepare(sqlite3.connect(self.uri, uri=True, check_same_thread=False))
+                    self._opened.append(conn)
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """Closes every connection the pool opened; call it once no thread is borrowing one."""
+        with self._lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened = []
+
+
+class SQLiteReadingStore:
+    """
+    Readings stored in SQLite, indexed on (device_id, timestamp).
+
+    Exposes the read interface of DataIngestionService (`load_file`,
+    `load_batch`, `load_index`, `iter_readings`, `iter_batches`,
+    `read_page`), with the database taking the place of the CSV path and
+    optional device/time filters answered from the index instead of a full
+    scan. `device_totals` computes per-device aggregates in SQL. The
+    filters are keyword-only, so a CSV path passed by mistake fails loudly
+    instead of being taken for a device id.
+
+    SQLite cannot store NaN, so readings with a NaN value are not returned
+    by the reads; they are recorded by device and time and counted in
+    `device_totals` as invalid, which the in-memory summaries also do.
+
+    Writes go through a single connection in WAL mode, one transaction per
+    call; reads use a pool of read-only connections, so concurrent readers
+    (e.g. MCP tool calls) don't serialize. The store is append-only.
+    """
+
+    def __init__(self, path: str, pool_size: int = DEFAULT_POOL_SIZE):
+        self.path = str(path)
+        self._writer = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.execute(_SCHEMA)
+        self._writer.execute(_SKIPPED_SCHEMA)
+        for statement in _INDEXES.values():
+            self._writer.execute(statement)
+        self._write_lock = threading.Lock()
+        self.pool = ConnectionPool(self.path, pool_size)
+
+    def __enter__(self) -> "SQLiteReadingStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the read pool and the writer connection."""
+        self.pool.close()
+        self._writer.close()
+
+    # -- writes ---------------------------------------------------------
+
+    def insert_batches(self, batches: Iterable[ReadingBatch]) -> int:
+        """
+        Bulk-inserts batches with `executemany` in a single transaction.
+
+        Loading into an empty store drops the indexes first and rebuilds them
+        once at the end, which is much faster than maintaining them per row.
+        Readings with a NaN value are recorded in `skipped_readings` instead.
+
+        Returns:
+            The number of readings inserted, skipped NaN readings included.
+        """
+        count = 0
+        with self._write_lock:
+            conn = self._writer
+            empty = conn.execute("SELECT NOT EXISTS (SELECT 1 FROM readings)").fetchone()[0]
+            conn.execute("BEGIN")
+            try:
+                if empty:
+                    for name in _INDEXES:
+                        conn.execute(f"DROP INDEX IF EXISTS {name}")
+                for batch in batches:
+                    skipped: List[Tuple[str, int]] = []
+                    conn.executemany(_INSERT, _storable_rows(batch, skipped))
+                    conn.executemany(_INSERT_SKIPPED, skipped)
+                    count += len(batch)
+                if empty:
+                    for statement in _INDEXES.values():
+                        conn.execute(statement)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def insert_readings(self, readings: Union[ReadingBatch, Iterable[EnergyReading]]) -> int:
+        """Inserts a ReadingBatch or an iterable of readings in one transaction."""
+        if not isinstance(readings, ReadingBatch):
+            readings = ReadingBatch.from_readings(readings)
+        return self.insert_batches([readings])
+
+    def import_csv(self, csv_path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Streams a readings CSV into the store.
+
+        Rows are validated exactly like `DataIngestionService.load_file`.
+
+        Returns:
+            The number of readings inserted.
+        """
+        return self.insert_batches(DataIngestionService().iter_batches(csv_path, batch_size))
+
+    # -- reads ----------------------------------------------------------
+
+    def data_version(self) -> int:
+        """Changes whenever readings are added; cheap enough to poll per request."""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT IFNULL((SELECT MAX(rowid) FROM readings), 0)"
+                " + IFNULL((SELECT MAX(rowid) FROM skipped_readings), 0)"
+            ).fetchone()[0]
+
+    def device_ids(self) -> List[str]:
+        """Ids of the devices with stored readings, sorted."""
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT device_id FROM readings ORDER BY device_id")]
+
+    def _iter_rows(
+        self,
+        device_id: Optional[str],
+        start: Optional[int],
+        end: Optional[int],
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[List[EpochRow]]:
+        clauses, params = _filters(device_id, start, end)
+        with self.pool.connection() as conn:
+            cursor = conn.execute(f"SELECT {_COLUMNS} FROM readings {_where(clauses)} ORDER BY rowid", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+
+    def iter_readings(
+        self,
+        *,
+        device_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[EnergyReading]:
+        """Lazily yields matching readings in insertion order."""
+        for rows in self._iter_rows(device_id, _epoch(start), _epoch(end)):
+            for row in rows:
+                yield EnergyReading(*row)
+
+    def load_file(
+        self,
+        *,
+        device_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[EnergyReading]:
+        """
+        Loads matching readings as EnergyReading objects.
+
+        Args:
+            device_id: Only return readings of this device.
+            start: Inclusive lower time bound, or None for no bound.
+            end: Exclusive upper time bound, or None for no bound.
+
+        Returns:
+            The readings, in insertion order.
+        """
+        return list(self.iter_readings(device_id=device_id, start=start, end=end))
+
+    def iter_batches(
+        self,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        device_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[ReadingBatch]:
+        """
+        Lazily yields matching readings as columnar chunks.
+
+        Raises:
+            ValueError: If batch_size is not positive.
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        for rows in self._iter_rows(device_id, _epoch(start), _epoch(end), batch_size):
+            batch = ReadingBatch()
+            batch.extend_rows(rows)
+            yield batch
+
+    def load_batch(
+        self,
+        *,
+        device_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> ReadingBatch:
+        """Loads matching readings into one ReadingBatch, using the index for filters."""
+        batch = ReadingBatch()
+        for rows in self._iter_rows(device_id, _epoch(start), _epoch(end)):
+            batch.extend_rows(rows)
+        return batch
+
+    def load_index(
+        self,
+        *,
+        device_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> ReadingIndex:
+        """
+        Loads matching readings into a per-device ReadingIndex.
+
+        Args:
+            device_id: Only index readings of this device.
+            start: Inclusive lower time bound, or None for no bound.
+            end: Exclusive upper time bound, or None for no bound.
+
+        Returns:
+            A ReadingIndex over the matching readings.
+        """
+        return ReadingIndex(self.load_batch(device_id=device_id, start=start, end=end))
+
+    def read_page(
+        self,
+        *,
+        offset: int = 0,
+        limit: int = 100,
+        device_id: Optional[str] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> Tuple[List[EpochRow], Optional[int]]:
+        """
+        Reads up to `limit` matching rows, resuming from a position cursor.
+
+        Same contract as `DataIngestionService.read_page`, except that
+        offsets are row ids, so a page starts with a seek instead of
+        skipping the rows before it. Pages filtered by device are a range
+        scan of the (device_id, rowid) index and cost the same at any depth;
+        otherwise rows from `offset` on are scanned in rowid order until the
+        page is full, which for time filters is short when readings were
+        inserted roughly in time order.
+
+        Returns:
+            A tuple of (rows, next_offset); next_offset is None on the last page.
+        """
+        clauses, params = _filters(device_id, start, end)
+        clauses.append("rowid >= ?")
+        params.extend((offset, limit + 1))
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT rowid, {_COLUMNS} FROM readings {_where(clauses)} ORDER BY rowid LIMIT ?", params
+            ).fetchall()
+        next_offset = rows[limit][0] if len(rows) > limit else None
+        return [row[1:] for row in rows[:limit]], next_offset
+
+    def device_totals(
+        self,
+        *,
+        device_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_gap_seconds: int = DEFAULT_MAX_GAP_SECONDS,
+    ) -> Dict[str, DeviceTotals]:
+        """
+        Aggregates counts, power, power factor, efficiency and kWh per device in SQL.
+
+        Feed the sums to `EnergyAnalytics.monthly_cost_from_totals` and divide
+        `efficiency_sum` by `readings` for the efficiency score. Like the
+        in-memory summaries, the sums cover only readings passing
+        `kernels.valid_rows`; the others are counted in `invalid_readings`.
+        Devices without a valid reading are left out.
+        """
+        clauses, params = _filters(device_id, _epoch(start), _epoch(end))
+        sql = _TOTALS.format(valid=_where([_VALID] + clauses), valid_rule=_VALID, filters=_where(clauses))
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params + params + [max_gap_seconds]).fetchall()
+        return {row[0]: DeviceTotals(*row) for row in rows}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__, file=sys.stderr)
+        sys.exit(2)
+    with SQLiteReadingStore(sys.argv[2]) as store:
+        count = store.import_csv(sys.argv[1])
+    print(f"Imported {count} readings into {sys.argv[2]}")
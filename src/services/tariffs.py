@@ -0,0 +1,262 @@
+import json
+import operator
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from models.reading import EnergyReading
+from models.reading_batch import ReadingBatch
+from models.tariff import Tariff, TariffCost
+from services import kernels
+from services.rollups import BASE_WINDOW_SECONDS, DEFAULT_MAX_GAP_SECONDS
+
+np = kernels.np
+
+# Rates are looked up per (weekday, 15-minute slot of the day).
+SLOTS_PER_DAY = 86400 // BASE_WINDOW_SECONDS
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+
+# 1970-01-01 was a Thursday (Monday = 0).
+_EPOCH_WEEKDAY = 3
+
+
+def slot_of_week(epoch_seconds: int) -> int:
+    """Returns the rate table slot (weekday * 96 + 15-minute slot) of a timestamp."""
+    days, seconds = divmod(epoch_seconds, 86400)
+    return (days + _EPOCH_WEEKDAY) % 7 * SLOTS_PER_DAY + seconds // BASE_WINDOW_SECONDS
+
+
+def _slot_of_day(clock: str) -> int:
+    hours, _, minutes = clock.partition(":")
+    minute = int(hours) * 60 + int(minutes or 0)
+    if minute % (BASE_WINDOW_SECONDS // 60) or not 0 <= minute <= 1440:
+        raise ValueError(f"Tariff band boundary {clock!r} is not on a 15-minute boundary")
+    return minute * 60 // BASE_WINDOW_SECONDS
+
+
+def rate_table(tariff: Tariff) -> Tuple[array, List[str]]:
+    """
+    Expands a tariff into a flat rate lookup table.
+
+    Returns:
+        A tuple of (rate per kWh, band name), each indexed by `slot_of_week`.
+
+    Raises:
+        ValueError: If a band boundary is not on a 15-minute boundary or a
+            weekday is outside 0-6.
+    """
+    rates = array('d', [tariff.default_rate]) * SLOTS_PER_WEEK
+    bands = [tariff.default_band] * SLOTS_PER_WEEK
+    for band in tariff.bands:
+        start, end = _slot_of_day(band.start), _slot_of_day(band.end)
+        if start <= end:
+            day_slots = list(range(start, end))
+        else:
+            day_slots = list(range(start, SLOTS_PER_DAY)) + list(range(0, end))
+        for weekday in band.weekdays:
+            if not 0 <= weekday < 7:
+                raise ValueError(f"Invalid weekday {weekday} in tariff band {band.name!r}")
+            offset = weekday * SLOTS_PER_DAY
+            for slot in day_slots:
+                rates[offset + slot] = band.rate
+                bands[offset + slot] = band.name
+    return rates, bands
+
+
+def load_tariffs(filepath: str) -> List[Tariff]:
+    """Loads tariffs from a JSON list of objects in the Tariff field layout."""
+    with open(filepath, "r") as f:
+        return [Tariff.from_dict(record) for record in json.load(f)]
+
+
+class TariffEngine:
+    """
+    Prices energy under several time-of-use tariffs in one pass.
+
+    Each tariff is expanded once into a 672-entry rate table (7 days x 96
+    fifteen-minute slots). Readings are reduced to energy per (device, slot
+    of week) with the same integration rules as RollupEngine, which is the
+    only per-row work; pricing is then a dot product of that small matrix
+    with each rate table, so adding tariffs costs nothing per reading.
+
+    The interval between consecutive readings of a device is split at slot
+    boundaries, and each part is billed at its own slot's rate, so an
+    interval crossing the start of a peak band is billed partly at the peak
+    rate. A reading older than its device's latest reading adds no energy,
+    as in RollupEngine; both backends apply this rule. Timestamps are taken
+    as local wall-clock time, as they appear in the readings file.
+    """
+
+    def __init__(self, tariffs: Iterable[Tariff], max_gap_seconds: int = DEFAULT_MAX_GAP_SECONDS):
+        self.tariffs = list(tariffs)
+        names = [t.name for t in self.tariffs]
+        if len(set(names)) != len(names):
+            raise ValueError("Tariff names must be unique")
+        self.max_gap_seconds = max_gap_seconds
+        self._tables = [rate_table(t) for t in self.tariffs]
+
+        self._device_ids: List[str] = []
+        self._device_lookup: Dict[str, int] = {}
+        # Wh per (device, slot of week), flattened row-major by device code.
+        self._energy = array('d')
+        self._covered = array('d')
+        self._last: Dict[int, Tuple[int, float]] = {}
+
+    def _encode(self, device_id: str) -> int:
+        code = self._device_lookup.get(device_id)
+        if code is None:
+            code = self._device_lookup[device_id] = len(self._device_ids)
+            self._device_ids.append(device_id)
+            self._energy.extend(array('d', bytes(8 * SLOTS_PER_WEEK)))
+            self._covered.append(0.0)
+        return code
+
+    def update(self, readings: Union[ReadingBatch, Iterable[EnergyReading]], backend: Optional[str] = None) -> None:
+        """
+        Folds a ReadingBatch or an iterable of readings into the engine.
+
+        Readings of a device should arrive in timestamp order, as for
+        RollupEngine.
+        """
+        if not isinstance(readings, ReadingBatch):
+            readings = ReadingBatch.from_readings(readings)
+        if not readings:
+            return
+        code_map = [self._encode(device_id) for device_id in readings.device_ids]
+        backend = backend or kernels.default_backend(len(readings))
+        if backend == "numpy":
+            self._update_numpy(readings, code_map)
+        elif backend == "python":
+            self._update_python(readings, code_map)
+        else:
+            raise ValueError(f"Unknown kernel backend: {backend}")
+
+    def _update_python(self, batch: ReadingBatch, code_map: List[int]) -> None:
+        energy, covered, last = self._energy, self._covered, self._last
+        max_gap = self.max_gap_seconds
+        for ts, code, v, c, pf in zip(
+            batch.timestamps, batch.device_codes, batch.voltage, batch.current, batch.power_factor
+        ):
+            device = code_map[code]
+            previous = last.get(device)
+            if previous is None or ts >= previous[0]:
+                if previous is not None and ts - previous[0] <= max_gap:
+                    start, watts = previous
+                    row = device * SLOTS_PER_WEEK
+                    t = start
+                    while t < ts:
+                        segment_end = min(ts, t - t % BASE_WINDOW_SECONDS + BASE_WINDOW_SECONDS)
+                        energy[row + slot_of_week(t)] += watts * (segment_end - t) / 3600.0
+                        t = segment_end
+                    covered[device] += ts - start
+                last[device] = (ts, v * c * pf)
+
+    def _update_numpy(self, batch: ReadingBatch, code_map: List[int]) -> None:
+        ts = np.asarray(batch.timestamps, dtype=np.int64)
+        device = np.asarray(code_map, dtype=np.int64)[np.asarray(batch.device_codes, dtype=np.int64)]
+        v, c, pf = kernels._as_float_arrays(batch.voltage, batch.current, batch.power_factor)
+        watts = v * c * pf
+
+        # Carry each device's last reading from earlier updates so intervals
+        # spanning two batches are integrated too.
+        carried = [d for d in set(code_map) if d in self._last]
+        if carried:
+            ts = np.concatenate((np.array([self._last[d][0] for d in carried], dtype=np.int64), ts))
+            device = np.concatenate((np.array(carried, dtype=np.int64), device))
+            watts = np.concatenate((np.array([self._last[d][1] for d in carried]), watts))
+
+        # Group rows by device, keeping arrival order within each device, and
+        # drop readings older than an earlier one of the same device, exactly
+        # as the sequential path does: a reading is kept iff it is not older
+        # than the running maximum timestamp of its device.
+        order = np.argsort(device, kind="stable")
+        ts, device, watts = ts[order], device[order], watts[order]
+        new_device = np.append(True, device[1:] != device[:-1])
+        # Offsetting each device's timestamps above the previous device's
+        # lets one cumulative maximum run over all devices independently.
+        rank = np.cumsum(new_device) - 1
+        shifted = ts - ts.min() + rank * (int(ts.max() - ts.min()) + 1)
+        running_max = np.maximum.accumulate(shifted)
+        kept = new_device.copy()
+        kept[1:] |= shifted[1:] >= running_max[:-1]
+        ts, device, watts = ts[kept], device[kept], watts[kept]
+
+        same_device = device[1:] == device[:-1]
+        gaps = np.diff(ts)
+        billed = same_device & (gaps <= self.max_gap_seconds)
+        starts = ts[:-1][billed]
+        ends = ts[1:][billed]
+        gaps = gaps[billed]
+        billed_device = device[:-1][billed]
+        billed_watts = watts[:-1][billed]
+
+        # Split each interval at 15-minute slot boundaries.
+        first_window = starts // BASE_WINDOW_SECONDS
+        pieces = np.where(ends > starts, (ends - 1) // BASE_WINDOW_SECONDS - first_window + 1, 0)
+        interval = np.repeat(np.arange(starts.size), pieces)
+        piece = np.arange(interval.size) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        window = (first_window[interval] + piece) * BASE_WINDOW_SECONDS
+        piece_start = np.maximum(starts[interval], window)
+        piece_end = np.minimum(ends[interval], window + BASE_WINDOW_SECONDS)
+        slots = (piece_start // 86400 + _EPOCH_WEEKDAY) % 7 * SLOTS_PER_DAY + piece_start % 86400 // BASE_WINDOW_SECONDS
+
+        devices = len(self._device_ids)
+        energy = np.frombuffer(self._energy, dtype=np.float64)
+        energy += np.bincount(
+            billed_device[interval] * SLOTS_PER_WEEK + slots,
+            weights=billed_watts[interval] * (piece_end - piece_start) / 3600.0,
+            minlength=devices * SLOTS_PER_WEEK,
+        )
+        covered = np.frombuffer(self._covered, dtype=np.float64)
+        covered += np.bincount(billed_device, weights=gaps.astype(np.float64), minlength=devices)
+        del energy, covered
+
+        last_rows = np.flatnonzero(np.append(~same_device, True))
+        for d, t, w in zip(device[last_rows].tolist(), ts[last_rows].tolist(), watts[last_rows].tolist()):
+            self._last[d] = (t, w)
+
+    def costs(self, device_id: Optional[str] = None) -> Dict[str, TariffCost]:
+        """
+        Prices the energy folded in so far under every tariff.
+
+        Args:
+            device_id: Restrict the result to a single device.
+
+        Returns:
+            A dict mapping tariff name to its TariffCost, in tariff order.
+            `projected_monthly_cost` scales each device's cost from the time
+            it was observed to a 30-day month, as
+            `EnergyAnalytics.project_monthly_cost_from_rollups` does.
+        """
+        if device_id is None:
+            devices = range(len(self._device_ids))
+        else:
+            code = self._device_lookup.get(device_id)
+            devices = [] if code is None else [code]
+
+        slot_energy = [0.0] * SLOTS_PER_WEEK
+        rows = []
+        for d in devices:
+            row = self._energy[d * SLOTS_PER_WEEK:(d + 1) * SLOTS_PER_WEEK]
+            slot_energy = list(map(operator.add, slot_energy, row))
+            rows.append((row, self._covered[d] / 3600.0))
+
+        results = {}
+        for tariff, (rates, bands) in zip(self.tariffs, self._tables):
+            monthly = 0.0
+            for row, hours in rows:
+                if hours:
+                    monthly += sum(map(operator.mul, row, rates)) / 1000.0 / hours * 720
+            band_kwh: Dict[str, float] = {}
+            band_cost: Dict[str, float] = {}
+            for wh, rate, band in zip(slot_energy, rates, bands):
+                if wh:
+                    band_kwh[band] = band_kwh.get(band, 0.0) + wh / 1000.0
+                    band_cost[band] = band_cost.get(band, 0.0) + wh / 1000.0 * rate
+            results[tariff.name] = TariffCost(
+                tariff=tariff.name,
+                kwh=sum(slot_energy) / 1000.0,
+                cost=sum(map(operator.mul, slot_energy, rates)) / 1000.0,
+                projected_monthly_cost=monthly,
+                band_kwh=band_kwh,
+                band_cost=band_cost,
+            )
+        return results
@@ -0,0 +1,69 @@
+import gc
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models.reading import EnergyReading, to_epoch_seconds
+
+
+@dataclass
+class LegacyEnergyReading:
+    """The dataclass EnergyReading replaced, as the memory baseline."""
+    timestamp: datetime
+    device_id: str
+    voltage: float
+    current: float
+    power_factor: float
+
+
+def bytes_per_reading(build, rows):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        readings = build(rows)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(readings) == len(rows)
+    return size / len(rows)
+
+
+def test_slotted_reading_is_smaller_than_legacy_dataclass():
+    start = to_epoch_seconds(datetime(2023, 10, 1))
+    rows = [(start + 900 * i, f"DEV{i % 50:03d}", 120.0, 2.5, 0.9) for i in range(20000)]
+
+    def legacy(rows):
+        # Fresh datetime and device id objects per row, as CSV parsing made them.
+        return [
+            LegacyEnergyReading(datetime(1970, 1, 1) + timedelta(seconds=ts), "".join(device_id), v, c, pf)
+            for ts, device_id, v, c, pf in rows
+        ]
+
+    def slotted(rows):
+        return [EnergyReading(ts, "".join(device_id), v, c, pf) for ts, device_id, v, c, pf in rows]
+
+    assert bytes_per_reading(slotted, rows) < bytes_per_reading(legacy, rows)
+
+
+def test_dataclass_helpers_use_timestamp_field():
+    reading = EnergyReading(datetime(2023, 10, 1, 12), "DEV001", 120.0, 2.0, 0.9)
+    assert asdict(reading)["timestamp"] == datetime(2023, 10, 1, 12)
+    assert "timestamp=" in repr(reading)
+    assert replace(reading, voltage=121.0).voltage == 121.0
+    assert replace(reading) == reading
+
+    reading.timestamp = datetime(2023, 10, 2)
+    assert reading.epoch_seconds == to_epoch_seconds(datetime(2023, 10, 2))
+
+
+def test_aware_timestamps_are_converted_to_utc():
+    aware = datetime(2023, 10, 1, 14, tzinfo=timezone(timedelta(hours=2)))
+    assert EnergyReading(aware, "DEV001", 120.0, 2.0, 0.9).timestamp == datetime(2023, 10, 1, 12)
+
+
+@pytest.mark.parametrize("timestamp", ["2023-10-01", 1.5, True])
+def test_invalid_timestamps_are_rejected(timestamp):
+    with pytest.raises(TypeError):
+        EnergyReading(timestamp, "DEV001", 120.0, 2.0, 0.9)
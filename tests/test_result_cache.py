@@ -0,0 +1,84 @@
+import os
+import shutil
+
+import pytest
+
+from models.group_summary import GroupSummary
+from models.tariff import Tariff
+from services.analytics import EnergyAnalytics
+from services.data_ingestion import DataIngestionService
+from services.result_cache import CachedAnalytics, ResultCache, decode_result, encode_result
+
+from conftest import DATA_DIR
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "readings.csv"
+    shutil.copy(DATA_DIR / "readings.csv", path)
+    return str(path)
+
+
+def test_encode_round_trips_result_types():
+    result = {
+        "groups": [GroupSummary("DEV001", 3, 0.5, 180.0, 0.2, 19.4)],
+        "pair": (True, 12.5),
+        "none": None,
+    }
+    assert decode_result(encode_result(result)) == result
+
+
+def test_decode_rejects_unknown_tags():
+    with pytest.raises(ValueError):
+        decode_result(b'{"Popen": {"args": "true"}}')
+    with pytest.raises(TypeError):
+        encode_result(object())
+
+
+def test_cached_results_match_and_survive_a_restart(tmp_path, csv_path):
+    analytics = EnergyAnalytics()
+    expected = analytics.calculate_score_and_cost(DataIngestionService().load_batch(csv_path))
+    db = str(tmp_path / "results.db")
+
+    with ResultCache(path=db) as cache:
+        cached = CachedAnalytics(analytics, cache)
+        assert cached.calculate_score_and_cost(csv_path) == expected
+        assert cached.calculate_score_and_cost(csv_path) == expected
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    with ResultCache(path=db) as cache:
+        assert CachedAnalytics(analytics, cache).calculate_score_and_cost(csv_path) == expected
+        assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_arguments_are_part_of_the_key(csv_path):
+    cached = CachedAnalytics()
+    assert cached.check_budget_exceeded(csv_path, 0.0)[0] is True
+    assert cached.check_budget_exceeded(csv_path, 1e9)[0] is False
+    costs = cached.compare_tariffs(csv_path, [Tariff("flat", 0.15), Tariff("cheap", 0.05)])
+    assert sorted(costs) == ["cheap", "flat"]
+    assert cached.cache.misses == 3
+
+
+def test_result_is_not_cached_when_the_file_changes_during_compute(csv_path):
+    cache = ResultCache()
+    original = cache.get_or_compute
+
+    def touch_then_compute(key, compute, still_valid=None):
+        def changing():
+            result = compute()
+            with open(csv_path, "a") as f:
+                f.write("2023-10-01 09:00:00,DEV001,120.0,1.5,0.96\n")
+            return result
+        return original(key, changing, still_valid)
+
+    cache.get_or_compute = touch_then_compute
+    CachedAnalytics(cache=cache).project_monthly_cost(csv_path)
+    assert len(cache) == 0
+
+
+def test_missing_path_raises(tmp_path):
+    missing = os.path.join(tmp_path, "missing.csv")
+    with pytest.raises(FileNotFoundError):
+        CachedAnalytics().calculate_complex_efficiency_score(missing)
+    assert CachedAnalytics().calculate_complex_efficiency_score(missing, fingerprint="empty") == 0.0
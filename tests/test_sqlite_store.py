@@ -0,0 +1,103 @@
+import math
+
+import pytest
+
+from services.accumulators import DeviceTotalsAccumulator
+from services.analytics import EnergyAnalytics
+from services.data_ingestion import DataIngestionService
+from services.kernels import valid_rows
+from services.sqlite_store import SQLiteReadingStore
+
+ROWS = [
+    "2023-10-01 08:00:00,DEV001,120.1,1.5,0.98",
+    "2023-10-01 08:00:00,DEV002,230.0,4.0,0.91",
+    "2023-10-01 08:15:00,DEV001,nan,1.6,0.97",
+    "2023-10-01 08:15:00,DEV002,229.5,4.1,0.90",
+    "2023-10-01 08:30:00,DEV001,119.9,1.4,0.99",
+    "2023-10-01 08:30:00,DEV002,231.0,inf,0.92",
+    "2023-10-01 08:45:00,DEV001,120.3,-1.0,0.95",
+    "2023-10-01 08:45:00,DEV002,230.2,3.9,NaN",
+    "2023-10-01 09:00:00,DEV001,120.0,1.5,0.96",
+    "2023-10-01 09:00:00,DEV003,nan,nan,nan",
+    "2023-10-01 09:15:00,DEV002,229.8,4.2,0.93",
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "readings.csv"
+    path.write_text("timestamp,device_id,voltage,current,power_factor\n" + "\n".join(ROWS) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path, csv_path):
+    with SQLiteReadingStore(str(tmp_path / "readings.db")) as store:
+        store.import_csv(csv_path)
+        yield store
+
+
+def test_import_keeps_going_past_nan_readings(tmp_path, csv_path):
+    with SQLiteReadingStore(str(tmp_path / "readings.db")) as store:
+        assert store.import_csv(csv_path) == len(ROWS)
+        assert len(store.load_batch()) == len(ROWS) - 3
+        assert all(not math.isnan(r.voltage) for r in store.load_file())
+        assert store.device_ids() == ["DEV001", "DEV002"]
+
+
+def test_device_totals_match_in_memory_analytics(store, csv_path):
+    index = DataIngestionService().load_index(csv_path)
+    analytics = EnergyAnalytics()
+    expected = DeviceTotalsAccumulator()
+    for device_id in index.device_ids():
+        expected.update_batch(index.lookup(device_id))
+
+    totals = store.device_totals()
+    assert sorted(totals) == ["DEV001", "DEV002"]
+    assert expected.devices["DEV003"].readings == 0
+    for device_id, t in totals.items():
+        readings = index.lookup(device_id)
+        valid = readings.take(valid_rows(readings.voltage, readings.current, readings.power_factor))
+        want = expected.devices[device_id]
+        assert t.readings == len(valid) == want.readings
+        assert t.invalid_readings == len(readings) - len(valid) == want.invalid_readings
+        assert t.efficiency_sum / t.readings == pytest.approx(analytics.calculate_complex_efficiency_score(valid))
+        assert analytics.monthly_cost_from_totals(t.power_sum_watts, t.readings) == pytest.approx(
+            analytics.project_monthly_cost(valid)
+        )
+        assert t.energy_wh == pytest.approx(want.energy_wh)
+        assert (t.first_timestamp, t.last_timestamp) == (want.first_timestamp, want.last_timestamp)
+
+
+def test_filtered_totals_count_skipped_nan_readings(store):
+    totals = store.device_totals(device_id="DEV002")
+    assert list(totals) == ["DEV002"]
+    assert totals["DEV002"].invalid_readings == 2
+
+
+def test_data_version_changes_when_only_nan_readings_arrive(tmp_path, csv_path):
+    with SQLiteReadingStore(str(tmp_path / "readings.db")) as store:
+        store.import_csv(csv_path)
+        before = store.data_version()
+        store.insert_readings(DataIngestionService().load_batch(csv_path).take([9]))
+        assert store.data_version() != before
+
+
+def test_read_page_cursor_walks_every_row_once(store):
+    pages, offset = [], 0
+    while offset is not None:
+        rows, offset = store.read_page(offset=offset, limit=2)
+        pages.extend(rows)
+    batch = store.load_batch()
+    assert [row[1] for row in pages] == [batch.device_ids[code] for code in batch.device_codes]
+
+    rows, offset = store.read_page(offset=0, limit=10, device_id="DEV001")
+    assert offset is None
+    assert [row[1] for row in rows] == ["DEV001"] * 4
+
+
+def test_filters_are_keyword_only(store, csv_path):
+    with pytest.raises(TypeError):
+        store.load_file(csv_path)
+    with pytest.raises(TypeError):
+        store.iter_batches(csv_path)